@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        # Регистрирует задачи очереди из модулей tasks.py приложений
+        autodiscover_modules('tasks')
+        from . import checks, db, mail  # noqa: F401
@@ -0,0 +1,141 @@
+"""Запуск WSGI-приложения под ASGI-сервером.
+
+В Django 2.2 нет ни ASGI-обработчика, ни асинхронных представлений.
+WsgiToAsgi принимает соединения в цикле событий, а каждый запрос
+целиком - от вызова приложения до закрытия ответа - выполняет в одном
+потоке пула: соединения с базой в Django привязаны к потоку. Медленная
+база или кэш занимают поток пула, а не весь воркер, и сервер продолжает
+принимать запросы. Части потокового ответа уходят клиенту по мере
+готовности.
+"""
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+async def read_body(receive):
+    body = BytesIO()
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ClientDisconnected
+        body.write(message.get('body', b''))
+        if not message.get('more_body', False):
+            return body
+
+
+def build_environ(scope, body):
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # WSGI передаёт путь байтами UTF-8, прочитанными как latin-1
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    body.seek(0)
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            # Отдельные заголовки Cookie (их шлёт HTTP/2) склеиваются
+            # через "; ", иначе куки после первой не разберутся
+            separator = '; ' if name == 'HTTP_COOKIE' else ','
+            value = f'{environ[name]}{separator}{value}'
+        environ[name] = value
+    return environ
+
+
+class WsgiToAsgi:
+    def __init__(self, application, threads):
+        self.application = application
+        self.executor = ThreadPoolExecutor(
+            threads, thread_name_prefix='asgi-request'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            try:
+                body = await read_body(receive)
+            except ClientDisconnected:
+                return
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                self.executor, self.handle,
+                build_environ(scope, body), send, loop
+            )
+        else:
+            raise ValueError(f'Неподдерживаемое соединение {scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def handle(self, environ, send, loop):
+        """Выполняется в потоке пула: вызывает приложение и передаёт
+        части ответа в цикл событий, дожидаясь отправки каждой."""
+        start = {}
+
+        def send_message(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def send_body(data, more_body=True):
+            # Заголовки уходят вместе с первой частью тела: до неё
+            # приложение может заменить ответ на ответ об ошибке
+            if start:
+                send_message(start.copy())
+                start.clear()
+            send_message({
+                'type': 'http.response.body', 'body': data,
+                'more_body': more_body,
+            })
+
+        def start_response(status, headers, exc_info=None):
+            start.update(
+                type='http.response.start',
+                status=int(status.split(' ', 1)[0]),
+                headers=[
+                    (name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in headers
+                ],
+            )
+            return send_body
+
+        result = self.application(environ, start_response)
+        try:
+            for chunk in result:
+                if chunk:
+                    send_body(chunk)
+            send_body(b'', more_body=False)
+        finally:
+            # Django закрывает соединения с базой в request_finished,
+            # то есть в том же потоке, где они открывались
+            if hasattr(result, 'close'):
+                result.close()
@@ -0,0 +1,47 @@
+import os
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+from .template_cache import django_engines, project_template_dirs
+
+STATIC_TAG = re.compile(r'''{%\s*static\s+['"]([^'"]+)['"]\s*%}''')
+
+
+def duplicate_static_includes(template_dirs):
+    """Пары (шаблон, {файл статики: число подключений}) для шаблонов,
+    где один файл статики подключён больше одного раза."""
+    duplicates = []
+    for template_dir in template_dirs:
+        for root, _, names in os.walk(template_dir):
+            for name in sorted(names):
+                path = os.path.join(root, name)
+                with open(path, encoding='utf-8') as template:
+                    counts = Counter(STATIC_TAG.findall(template.read()))
+                repeated = {
+                    asset: count for asset, count in counts.items()
+                    if count > 1
+                }
+                if repeated:
+                    duplicates.append((path, repeated))
+    return duplicates
+
+
+@register(Tags.templates)
+def check_duplicate_static_includes(app_configs, **kwargs):
+    return [
+        Warning(
+            f'{asset} подключается в шаблоне {count} раз(а)',
+            hint='Оставьте одно подключение: иначе браузер загрузит '
+                 'и применит файл повторно.',
+            obj=os.path.relpath(path, settings.BASE_DIR),
+            id='core.W001',
+        )
+        for path, repeated in duplicate_static_includes(sorted({
+            directory for engine in django_engines()
+            for directory in project_template_dirs(engine)
+        }))
+        for asset, count in repeated.items()
+    ]
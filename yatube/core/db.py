@@ -0,0 +1,20 @@
+"""Настройка соединений с SQLite.
+
+Каждое новое соединение получает PRAGMA из settings.SQLITE_PRAGMAS.
+В режиме WAL читатели видят последний закоммиченный снимок и не ждут
+пишущего, а пишущий не ждёт читателей; synchronous=NORMAL в этом
+режиме безопасен и не делает fsync на каждый коммит. С CONN_MAX_AGE
+соединение и его настройки живут дольше одного запроса.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def set_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,181 @@
+"""Сбор замеров одного запроса: SQL, шаблоны и кэш.
+
+Внутри with profile() as stats запросы всех соединений текущего потока
+проходят через execute_wrapper, а методы чтения кэшей подменяются на
+время блока. Отрисовка шаблонов замеряется обёрткой Template.render,
+которую ставит instrument_templates(): вне profile() обёртка сразу
+передаёт вызов дальше. Для потоковых ответов middleware продолжают
+замеры при отдаче тела через within().
+"""
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.base import Template
+
+# Замеры текущего запроса; None вне profile()
+_current = ContextVar('profile_stats', default=None)
+
+
+class ProfileStats:
+    def __init__(self):
+        self.queries = []
+        # Имя шаблона -> [число отрисовок, время в секундах]; время
+        # включает вложенные шаблоны
+        self.templates = defaultdict(lambda: [0, 0.0])
+        # Псевдоним кэша -> [попадания, промахи]
+        self.caches = defaultdict(lambda: [0, 0])
+
+    def record_query(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((
+                context['connection'].alias, sql, params,
+                perf_counter() - started
+            ))
+
+    @property
+    def sql_time(self):
+        return sum(query[3] for query in self.queries)
+
+    def similar_queries(self, minimum=2):
+        """SQL без параметров, выполненный не меньше minimum раз:
+        признак N+1."""
+        counts = Counter(sql for _, sql, _, _ in self.queries)
+        return {
+            sql: count for sql, count in counts.items() if count >= minimum
+        }
+
+    def duplicate_queries(self):
+        """Запросы, повторённые с теми же параметрами."""
+        counts = Counter(
+            (sql, repr(params)) for _, sql, params, _ in self.queries
+        )
+        return {
+            sql: count for (sql, _), count in counts.items() if count > 1
+        }
+
+    def record_template(self, name, duration):
+        stats = self.templates[name]
+        stats[0] += 1
+        stats[1] += duration
+
+    def record_cache(self, alias, hits, misses):
+        stats = self.caches[alias]
+        stats[0] += hits
+        stats[1] += misses
+
+    @property
+    def cache_hits(self):
+        return sum(hits for hits, _ in self.caches.values())
+
+    @property
+    def cache_misses(self):
+        return sum(misses for _, misses in self.caches.values())
+
+    @property
+    def cache_ratio(self):
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else None
+
+
+def counting_get(stats, alias, get):
+    def wrapper(key, default=None, version=None):
+        value = get(key, default, version=version)
+        hit = value is not default
+        stats.record_cache(alias, hit, not hit)
+        return value
+    return wrapper
+
+
+def counting_get_many(stats, alias, get_many):
+    def wrapper(keys, version=None):
+        keys = list(keys)
+        found = get_many(keys, version=version)
+        stats.record_cache(alias, len(found), len(keys) - len(found))
+        return found
+    return wrapper
+
+
+@contextmanager
+def replaced(obj, name, value):
+    """Подменяет атрибут экземпляра на время блока."""
+    missing = object()
+    previous = obj.__dict__.get(name, missing)
+    setattr(obj, name, value)
+    try:
+        yield
+    finally:
+        if previous is missing:
+            delattr(obj, name)
+        else:
+            setattr(obj, name, previous)
+
+
+@contextmanager
+def profile(stats=None):
+    """Замеры блока; с stats - продолжение уже начатых замеров."""
+    if stats is None:
+        stats = ProfileStats()
+    token = _current.set(stats)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(stats.record_query)
+                )
+            for alias in settings.CACHES:
+                cache = caches[alias]
+                stack.enter_context(replaced(
+                    cache, 'get', counting_get(stats, alias, cache.get)
+                ))
+                stack.enter_context(replaced(
+                    cache, 'get_many',
+                    counting_get_many(stats, alias, cache.get_many)
+                ))
+            yield stats
+    finally:
+        _current.reset(token)
+
+
+def within(context, chunks):
+    """Отдаёт части потокового ответа, получая каждую внутри context().
+
+    Тело такого ответа собирается уже после выхода из middleware: так
+    замеры и состояние запроса охватывают и его."""
+    chunks = iter(chunks)
+    while True:
+        with context():
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+        yield chunk
+
+
+def _timed_render(render):
+    def wrapper(self, context):
+        stats = _current.get()
+        if stats is None:
+            return render(self, context)
+        started = perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            stats.record_template(
+                self.origin.template_name or self.name or '<string>',
+                perf_counter() - started
+            )
+    wrapper.timed = True
+    return wrapper
+
+
+def instrument_templates():
+    if not getattr(Template.render, 'timed', False):
+        Template.render = _timed_render(Template.render)
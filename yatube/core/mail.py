@@ -0,0 +1,141 @@
+"""Отправка почты через очередь задач.
+
+QueuedEmailBackend только сохраняет письма и ставит задачу доставки,
+поэтому запрос (например, сброс пароля) не ждёт ни диска, ни SMTP.
+Задача отправляет накопившиеся письма пачками через одно соединение
+настоящего бэкенда EMAIL_DELIVERY_BACKEND.
+"""
+import json
+import smtplib
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutgoingEmail
+from .tasks import task, write_lock
+
+
+class EmailDeliveryError(Exception):
+    pass
+
+
+def dump_message(message):
+    if message.attachments:
+        raise ValueError('Вложения в очереди писем не поддерживаются')
+    return json.dumps({
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+        'content_subtype': message.content_subtype,
+    })
+
+
+def load_message(data):
+    data = json.loads(data)
+    content_subtype = data.pop('content_subtype')
+    data['alternatives'] = [tuple(pair) for pair in data['alternatives']]
+    message = EmailMultiAlternatives(**data)
+    message.content_subtype = content_subtype
+    return message
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        emails = [
+            OutgoingEmail(message=dump_message(message))
+            for message in email_messages if message.recipients()
+        ]
+        if not emails:
+            return 0
+        OutgoingEmail.objects.bulk_create(emails)
+        # Письма одного окна EMAIL_BATCH_DELAY собирает одна задача
+        window = settings.EMAIL_BATCH_DELAY
+        key = None
+        if window:
+            key = f'core.mail.deliver:{int(time.time() // window)}'
+        deliver_emails.enqueue(key=key, delay=window)
+        return len(emails)
+
+
+def claim_emails(last_pk):
+    """Забирает следующую пачку неотправленных писем после last_pk.
+    Условие в UPDATE не даёт двум задачам доставки (соседних окон или
+    повтору и новой задаче) отправить одно письмо дважды. Возвращает
+    последний просмотренный pk и забранные письма или None, когда писем
+    больше нет."""
+    now = timezone.now()
+    free = Q(claimed_until=None) | Q(claimed_until__lt=now)
+    candidates = list(
+        OutgoingEmail.objects.filter(
+            free, sent_at=None, attempts__lt=settings.EMAIL_MAX_ATTEMPTS,
+            pk__gt=last_pk,
+        ).values_list('pk', flat=True)[:settings.EMAIL_BATCH_SIZE]
+    )
+    if not candidates:
+        return None
+    token = uuid.uuid4().hex
+    with write_lock():
+        OutgoingEmail.objects.filter(
+            free, pk__in=candidates, sent_at=None
+        ).update(
+            claim=token,
+            claimed_until=now + timedelta(
+                seconds=settings.TASK_LOCK_TIMEOUT
+            ),
+        )
+    return candidates[-1], list(
+        OutgoingEmail.objects.filter(pk__in=candidates, claim=token)
+    )
+
+
+def _save_results(sent, failed):
+    with write_lock():
+        OutgoingEmail.objects.filter(pk__in=sent).update(
+            sent_at=timezone.now(), claim='', claimed_until=None
+        )
+        for pk, error in failed.items():
+            OutgoingEmail.objects.filter(pk=pk).update(
+                attempts=F('attempts') + 1, last_error=error,
+                claim='', claimed_until=None,
+            )
+
+
+@task(atomic=False)
+def deliver_emails():
+    """Отправляет письма из очереди через одно соединение. Если часть
+    писем не ушла, задача падает и повторяется с задержкой."""
+    last_pk = 0
+    failures = 0
+    with get_connection(settings.EMAIL_DELIVERY_BACKEND) as connection:
+        while True:
+            claimed = claim_emails(last_pk)
+            if claimed is None:
+                break
+            last_pk, batch = claimed
+            sent, failed = [], {}
+            for email in batch:
+                try:
+                    connection.send_messages([load_message(email.message)])
+                except Exception as error:
+                    failed[email.pk] = repr(error)
+                    if isinstance(error, smtplib.SMTPServerDisconnected):
+                        connection.close()
+                        connection.open()
+                else:
+                    sent.append(email.pk)
+            _save_results(sent, failed)
+            failures += len(failed)
+    if failures:
+        raise EmailDeliveryError(f'Не отправлено писем: {failures}')
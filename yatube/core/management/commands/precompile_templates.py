@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.template_cache import (
+    django_engines, project_template_dirs, reset_template_caches,
+    template_names, uses_cached_loader, warm_templates
+)
+
+
+class Command(BaseCommand):
+    help = ('Разбирает все шаблоны проекта заранее и, с --benchmark, '
+            'сравнивает холодную и тёплую загрузку шаблонов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--benchmark', action='store_true',
+                            help='Замерить загрузку с пустым и полным кэшем')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Число замеров для каждого шаблона')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        loaded, errors = warm_templates()
+        elapsed = (time.perf_counter() - started) * 1000
+        for error in errors:
+            self.stderr.write(error)
+        self.stdout.write(
+            f'Разобрано шаблонов: {loaded} за {elapsed:.1f} мс'
+        )
+        if not all(uses_cached_loader(e) for e in django_engines()):
+            self.stdout.write(self.style.WARNING(
+                'Кэширующий загрузчик выключен (DEBUG = True?): шаблоны '
+                'разбираются заново при каждой отрисовке'
+            ))
+        if options['benchmark']:
+            self.benchmark(options['repeat'])
+        if errors:
+            raise CommandError(f'Шаблонов с ошибками: {len(errors)}')
+
+    def benchmark(self, repeat):
+        cold = warm = 0
+        for engine in django_engines():
+            for directory in project_template_dirs(engine):
+                for name in template_names(directory):
+                    cold += self.measure(engine, name, repeat, reset=True)
+                    warm += self.measure(engine, name, repeat, reset=False)
+        self.stdout.write(
+            f'Загрузка всех шаблонов: холодный кэш {cold:.2f} мс, '
+            f'тёплый кэш {warm:.2f} мс, ускорение {cold / warm:.0f}x'
+        )
+
+    @staticmethod
+    def measure(engine, name, repeat, reset):
+        """Среднее время загрузки шаблона в миллисекундах."""
+        total = 0
+        for _ in range(repeat):
+            if reset:
+                reset_template_caches()
+            else:
+                engine.get_template(name)
+            started = time.perf_counter()
+            engine.get_template(name)
+            total += time.perf_counter() - started
+        return total / repeat * 1000
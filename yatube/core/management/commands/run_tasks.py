@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.tasks import prune, run_pending
+
+
+class Command(BaseCommand):
+    help = 'Обработчик очереди фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Число потоков для выполнения задач')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Сколько задач забирать за раз')
+        parser.add_argument('--sleep', type=float, default=1.0,
+                            help='Пауза в секундах, когда очередь пуста')
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить готовые задачи и выйти')
+        parser.add_argument('--prune-older-than', type=float,
+                            metavar='DAYS',
+                            help='Удалять выполненные задачи старше DAYS '
+                                 'дней, когда очередь пуста')
+
+    def handle(self, *args, **options):
+        done = 0
+        while True:
+            count = run_pending(options['batch_size'], options['workers'])
+            done += count
+            if count:
+                continue
+            if options['prune_older_than'] is not None:
+                prune(options['prune_older_than'])
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {done}'))
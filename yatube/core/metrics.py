@@ -0,0 +1,381 @@
+"""Метрики процесса в формате Prometheus.
+
+MetricsMiddleware считает запросы по имени представления, время ответа,
+SQL-запросы и обращения к кэшу (через core.instrumentation.profile) и
+копит их в памяти процесса. Не чаще раза в METRICS_FLUSH_INTERVAL секунд
+процесс записывает свой снимок в METRICS_DIR/<pid>.json. Представление
+metrics() складывает снимки всех воркеров: счётчики и гистограммы
+суммируются, а память показывается только для живых процессов. Снимки
+завершившихся процессов переносятся в общий итог aggregate.json
+и удаляются, поэтому файлов не больше, чем живых воркеров, а новый
+процесс с тем же pid не затирает чужие счётчики. Страница доступна
+только с адресов METRICS_ALLOWED_IPS или с токеном METRICS_TOKEN.
+"""
+import fcntl
+import hmac
+import json
+import os
+import resource
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from glob import glob
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import Http404, HttpResponse
+
+from .instrumentation import profile, within
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+QUERY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# Запросы к несуществующим адресам - одна метка, иначе число рядов
+# метрик растёт с каждым новым адресом
+UNRESOLVED = '<unresolved>'
+METRICS = {
+    'yatube_http_requests_total': (
+        'counter', 'HTTP requests by view name, method and status'
+    ),
+    'yatube_http_request_duration_seconds': (
+        'histogram', 'Time to build a response by view name'
+    ),
+    'yatube_db_queries_per_request': (
+        'histogram', 'SQL statements run by one request, by view name'
+    ),
+    'yatube_db_query_duration_seconds': (
+        'histogram', 'SQL statement duration by database alias'
+    ),
+    'yatube_cache_requests_total': (
+        'counter', 'Cache reads by cache alias and result'
+    ),
+    'yatube_process_resident_memory_bytes': (
+        'gauge', 'Resident memory of a live worker process'
+    ),
+}
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+AGGREGATE = 'aggregate.json'
+
+
+def resident_memory():
+    """Занятая процессом память в байтах; None вне Linux."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class MetricsStore:
+    """Метрики одного процесса. Ключ ряда - (имя, метки), метки -
+    кортеж пар (имя, значение)."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.pid = os.getpid()
+        self.path = os.path.join(directory, f'{self.pid}.json')
+        self.lock = threading.Lock()
+        self.counters = defaultdict(int)
+        # Ключ ряда -> [границы, счётчики по границам, сумма, число]
+        self.histograms = {}
+        self.flushed_at = 0
+        # Файл с нашим pid остался от завершившегося процесса: его
+        # счётчики переносятся в общий итог, а не затираются
+        if os.path.exists(self.path):
+            with directory_lock(directory):
+                retire(directory, [self.path])
+
+    def inc(self, name, labels, amount=1):
+        with self.lock:
+            self.counters[name, labels] += amount
+
+    def observe(self, name, labels, value, buckets):
+        with self.lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[name, labels] = [
+                    buckets, [0] * len(buckets), 0, 0
+                ]
+            for number, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[1][number] += 1
+                    break
+            histogram[2] += value
+            histogram[3] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return snapshot_data(
+                self.pid, resident_memory(), self.counters, self.histograms
+            )
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        interval = settings.METRICS_FLUSH_INTERVAL
+        if not force and now - self.flushed_at < interval:
+            return
+        self.flushed_at = now
+        os.makedirs(self.directory, exist_ok=True)
+        write_snapshot(self.path, self.snapshot())
+
+
+def snapshot_data(pid, memory, counters, histograms):
+    return {
+        'pid': pid,
+        'memory': memory,
+        'counters': [
+            [name, list(labels), value]
+            for (name, labels), value in counters.items()
+        ],
+        'histograms': [
+            [name, list(labels), list(buckets), list(counts), total, count]
+            for (name, labels), (buckets, counts, total, count)
+            in histograms.items()
+        ],
+    }
+
+
+def write_snapshot(path, data):
+    # Читатели видят либо старый, либо новый файл целиком
+    temporary = f'{path}.{threading.get_ident()}.tmp'
+    with open(temporary, 'w') as snapshot:
+        json.dump(data, snapshot)
+    os.replace(temporary, path)
+
+
+def read_snapshot(path):
+    try:
+        with open(path) as snapshot:
+            return json.load(snapshot)
+    except (OSError, ValueError):
+        return None
+
+
+def add_snapshot(data, counters, histograms):
+    for name, labels, value in data['counters']:
+        counters[name, tuple(map(tuple, labels))] += value
+    for name, labels, buckets, counts, total, count in data['histograms']:
+        key = name, tuple(map(tuple, labels))
+        if key not in histograms:
+            histograms[key] = [buckets, [0] * len(buckets), 0, 0]
+        histogram = histograms[key]
+        histogram[1] = [a + b for a, b in zip(histogram[1], counts)]
+        histogram[2] += total
+        histogram[3] += count
+
+
+@contextmanager
+def directory_lock(directory):
+    """Переносить снимки в общий итог может один процесс за раз: иначе
+    снимок завершившегося воркера был бы учтён дважды."""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def retire(directory, paths):
+    """Добавляет снимки paths в aggregate.json и удаляет их файлы.
+    Вызывается под directory_lock."""
+    counters = defaultdict(int)
+    histograms = {}
+    aggregate_path = os.path.join(directory, AGGREGATE)
+    for path in (aggregate_path, *paths):
+        data = read_snapshot(path)
+        if data is not None:
+            add_snapshot(data, counters, histograms)
+    write_snapshot(
+        aggregate_path, snapshot_data(None, None, counters, histograms)
+    )
+    for path in paths:
+        os.remove(path)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Хранилище текущего процесса; после fork - новое, со своим
+    файлом."""
+    global _store
+    directory = settings.METRICS_DIR
+    with _store_lock:
+        if (
+            _store is None or _store.pid != os.getpid()
+            or _store.directory != directory
+        ):
+            _store = MetricsStore(directory)
+        return _store
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect(directory):
+    """Суммирует общий итог и снимки живых процессов из directory;
+    снимки завершившихся процессов сначала переносятся в общий итог."""
+    counters = defaultdict(int)
+    histograms = {}
+    memory = []
+    with directory_lock(directory):
+        snapshots = {}
+        for path in sorted(glob(os.path.join(directory, '*.json'))):
+            if os.path.basename(path) == AGGREGATE:
+                continue
+            data = read_snapshot(path)
+            if data is not None:
+                snapshots[path] = data
+        dead = [
+            path for path, data in snapshots.items()
+            if not is_alive(data['pid'])
+        ]
+        if dead:
+            retire(directory, dead)
+        aggregate = read_snapshot(os.path.join(directory, AGGREGATE))
+    if aggregate is not None:
+        add_snapshot(aggregate, counters, histograms)
+    for path, data in snapshots.items():
+        if path in dead:
+            continue
+        add_snapshot(data, counters, histograms)
+        if data['memory'] is not None:
+            memory.append((data['pid'], data['memory']))
+    return counters, histograms, memory
+
+
+def format_labels(labels):
+    return '{%s}' % ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n')
+        )
+        for name, value in labels
+    )
+
+
+def exposition(counters, histograms, memory):
+    """Текст в формате Prometheus."""
+    series = defaultdict(list)
+    for (name, labels), value in sorted(counters.items()):
+        series[name].append(f'{name}{format_labels(labels)} {value}')
+    for (name, labels), (buckets, counts, total, count) in sorted(
+        histograms.items()
+    ):
+        cumulative = 0
+        for bound, bucket_count in zip(buckets, counts):
+            cumulative += bucket_count
+            series[name].append('{}_bucket{} {}'.format(
+                name, format_labels((*labels, ('le', f'{bound:g}'))),
+                cumulative
+            ))
+        series[name].append('{}_bucket{} {}'.format(
+            name, format_labels((*labels, ('le', '+Inf'))), count
+        ))
+        series[name].append(f'{name}_sum{format_labels(labels)} {total}')
+        series[name].append(f'{name}_count{format_labels(labels)} {count}')
+    name = 'yatube_process_resident_memory_bytes'
+    for pid, value in memory:
+        series[name].append(f'{name}{format_labels((("pid", pid),))} {value}')
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        if series[name]:
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(series[name])
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_allowed(request):
+    token = settings.METRICS_TOKEN
+    if token and hmac.compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+    ):
+        return True
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+def metrics(request):
+    # Для чужих адресов страницы нет вовсе
+    if not settings.METRICS_DIR or not metrics_allowed(request):
+        raise Http404
+    get_store().flush(force=True)
+    return HttpResponse(
+        exposition(*collect(settings.METRICS_DIR)), content_type=CONTENT_TYPE
+    )
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        if not settings.METRICS_DIR:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with profile() as stats:
+            response = self.get_response(request)
+        if response.streaming:
+            response.streaming_content = self.stream(
+                request, response.status_code, response.streaming_content,
+                stats, started
+            )
+        else:
+            self.record(
+                request, response.status_code, stats,
+                time.perf_counter() - started
+            )
+        return response
+
+    def stream(self, request, status, chunks, stats, started):
+        """Тело потокового ответа; запрос учитывается, когда тело
+        отдано или сборка оборвалась ошибкой."""
+        try:
+            yield from within(lambda: profile(stats), chunks)
+        except Exception:
+            status = 500
+            raise
+        finally:
+            self.record(
+                request, status, stats, time.perf_counter() - started
+            )
+
+    def record(self, request, status, stats, duration):
+        view = getattr(request.resolver_match, 'view_name', UNRESOLVED)
+        store = get_store()
+        store.inc('yatube_http_requests_total', (
+            ('view', view), ('method', request.method), ('status', status),
+        ))
+        store.observe(
+            'yatube_http_request_duration_seconds', (('view', view),),
+            duration, REQUEST_BUCKETS
+        )
+        store.observe(
+            'yatube_db_queries_per_request', (('view', view),),
+            len(stats.queries), QUERY_COUNT_BUCKETS
+        )
+        for alias, _, _, query_time in stats.queries:
+            store.observe(
+                'yatube_db_query_duration_seconds', (('alias', alias),),
+                query_time, QUERY_BUCKETS
+            )
+        for alias, (hits, misses) in stats.caches.items():
+            for result, count in (('hit', hits), ('miss', misses)):
+                if count:
+                    store.inc(
+                        'yatube_cache_requests_total',
+                        (('cache', alias), ('result', result)), count
+                    )
+        store.flush()
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outgoingemail',
+            name='claim',
+            field=models.CharField(blank=True, help_text='Задача доставки, которая отправляет письмо', max_length=32, verbose_name='Метка задачи доставки'),
+        ),
+        migrations.AddField(
+            model_name='outgoingemail',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, help_text='После этого срока письмо может взять другая задача', null=True, verbose_name='Занято до'),
+        ),
+    ]
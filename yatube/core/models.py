@@ -0,0 +1,127 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """Отложенная задача очереди. Строка пишется в той же транзакции,
+    что и изменение, которое её породило, и обработчик видит её только
+    после коммита."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'Ожидает'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(
+        max_length=200,
+        verbose_name='Задача',
+        help_text='Имя зарегистрированной функции'
+    )
+    args = models.TextField(
+        default='[]',
+        verbose_name='Аргументы',
+        help_text='Позиционные аргументы функции в JSON'
+    )
+    key = models.CharField(
+        max_length=200,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name='Ключ идемпотентности',
+        help_text='Задача с тем же ключом не ставится в очередь повторно'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING,
+        verbose_name='Состояние'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попытки'
+    )
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Выполнить после'
+    )
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Занята до',
+        help_text='После этого момента задачу упавшего обработчика '
+                  'может взять другой'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Создана'
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка'
+    )
+
+    class Meta:
+        ordering = ('run_after',)
+        indexes = (
+            models.Index(
+                fields=('status', 'run_after'), name='task_due_idx'
+            ),
+        )
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+
+    def __str__(self):
+        return f'{self.name} ({self.get_status_display()})'
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку обработчиком задач."""
+    message = models.TextField(
+        verbose_name='Письмо',
+        help_text='Поля письма в JSON'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Создано'
+    )
+    sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Отправлено'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Неудачные попытки'
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка'
+    )
+    claim = models.CharField(
+        max_length=32,
+        blank=True,
+        verbose_name='Метка задачи доставки',
+        help_text='Задача доставки, которая отправляет письмо'
+    )
+    claimed_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Занято до',
+        help_text='После этого срока письмо может взять другая задача'
+    )
+
+    class Meta:
+        ordering = ('pk',)
+        indexes = (
+            models.Index(fields=('sent_at', 'id'), name='email_unsent_idx'),
+        )
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+
+    def __str__(self):
+        return f'{self.pk}: {"отправлено" if self.sent_at else "в очереди"}'
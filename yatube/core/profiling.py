@@ -0,0 +1,119 @@
+"""Выборочное профилирование запросов.
+
+ProfilingMiddleware замеряет долю PROFILING_SAMPLE_RATE запросов: время
+ответа, число и время SQL-запросов, повторы запросов, время шаблонов
+и попадания в кэш. Итог пишется строкой JSON в лог core.profiling
+и, с PROFILING_SERVER_TIMING, в заголовок Server-Timing, который
+показывают инструменты разработчика браузера. Заголовок раскрывает
+устройство сайта, поэтому уходит только сотрудникам или при DEBUG.
+При нулевой доле middleware отключается целиком.
+"""
+import json
+import logging
+import random
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .instrumentation import instrument_templates, profile, within
+
+logger = logging.getLogger(__name__)
+# Сколько самых долгих шаблонов попадает в лог и в Server-Timing
+SLOWEST_TEMPLATES = 5
+
+
+def milliseconds(seconds):
+    return round(seconds * 1000, 2)
+
+
+def profile_record(request, status, stats, duration):
+    templates = sorted(
+        stats.templates.items(), key=lambda item: item[1][1], reverse=True
+    )[:SLOWEST_TEMPLATES]
+    return {
+        'method': request.method,
+        'path': request.path,
+        'view': getattr(request.resolver_match, 'view_name', None),
+        'status': status,
+        'total_ms': milliseconds(duration),
+        'sql_count': len(stats.queries),
+        'sql_ms': milliseconds(stats.sql_time),
+        'similar_queries': stats.similar_queries(
+            settings.PROFILING_SIMILAR_QUERIES
+        ),
+        'duplicate_queries': stats.duplicate_queries(),
+        'templates': {
+            name: {'count': count, 'ms': milliseconds(seconds)}
+            for name, (count, seconds) in templates
+        },
+        'cache_hits': stats.cache_hits,
+        'cache_misses': stats.cache_misses,
+        'cache_hit_ratio': stats.cache_ratio,
+    }
+
+
+def server_timing(record):
+    metrics = [
+        f'total;dur={record["total_ms"]}',
+        f'sql;dur={record["sql_ms"]};desc="{record["sql_count"]} queries"',
+        'cache;desc="{} hits, {} misses"'.format(
+            record['cache_hits'], record['cache_misses']
+        ),
+    ]
+    metrics.extend(
+        'tpl{};dur={};desc="{}"'.format(number, template['ms'], name)
+        for number, (name, template) in enumerate(
+            record['templates'].items(), 1
+        )
+    )
+    return ', '.join(metrics)
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING_SAMPLE_RATE:
+            raise MiddlewareNotUsed
+        instrument_templates()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+        started = perf_counter()
+        with profile() as stats:
+            response = self.get_response(request)
+        if response.streaming:
+            # Заголовки потокового ответа уже не изменить: замер тела
+            # попадает только в лог
+            response.streaming_content = self.stream(
+                request, response.status_code, response.streaming_content,
+                stats, started
+            )
+            return response
+        record = self.log(
+            request, response.status_code, stats, perf_counter() - started
+        )
+        if settings.PROFILING_SERVER_TIMING and (
+            settings.DEBUG or getattr(request, 'user', None)
+            and request.user.is_staff
+        ):
+            response['Server-Timing'] = server_timing(record)
+        return response
+
+    def stream(self, request, status, chunks, stats, started):
+        try:
+            yield from within(lambda: profile(stats), chunks)
+        except Exception:
+            status = 500
+            raise
+        finally:
+            self.log(request, status, stats, perf_counter() - started)
+
+    def log(self, request, status, stats, duration):
+        record = profile_record(request, status, stats, duration)
+        # Повторяющийся запрос - вероятный N+1: такие ответы видны
+        # в логе на уровне WARNING
+        level = logging.WARNING if record['similar_queries'] else logging.INFO
+        logger.log(level, json.dumps(record, ensure_ascii=False))
+        return record
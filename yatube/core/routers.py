@@ -0,0 +1,110 @@
+"""Чтение с реплик.
+
+ReplicaRouter отправляет чтения моделей из REPLICA_APPS на реплики из
+DATABASE_REPLICAS, а все записи - в default. С реплик читают только
+запросы GET и HEAD, прошедшие через ReplicaMiddleware; фоновые задачи,
+команды и POST-запросы читают с основной базы. После записи
+пользователь ещё REPLICA_LAG секунд читает с основной базы - это помнит
+кука, - поэтому сразу видит свой пост, даже если реплика отстаёт.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from .instrumentation import within
+
+PIN_COOKIE = 'pin_primary'
+
+
+class ReadState:
+    def __init__(self, use_replicas):
+        self.use_replicas = use_replicas
+        self.wrote = False
+
+
+# Состояние текущего запроса; None вне запросов
+_state = ContextVar('replica_read_state', default=None)
+
+
+@contextmanager
+def read_state(state):
+    token = _state.set(state)
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+def reading_from_replicas():
+    state = _state.get()
+    return bool(
+        settings.DATABASE_REPLICAS and state is not None
+        and state.use_replicas
+    )
+
+
+def replica_may_lag(changed_at):
+    """Могла ли реплика, с которой читает запрос, ещё не получить
+    изменение, сделанное в момент changed_at (time.time())."""
+    return (
+        reading_from_replicas()
+        and time.time() - changed_at < settings.REPLICA_LAG
+    )
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (
+            model._meta.app_label in settings.REPLICA_APPS
+            and reading_from_replicas()
+        ):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Объект мог быть прочитан с реплики, но пишем всегда в default;
+        # остаток запроса читает оттуда же
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+            state.use_replicas = False
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = ReadState(
+            request.method in ('GET', 'HEAD')
+            and PIN_COOKIE not in request.COOKIES
+        )
+        with read_state(state):
+            response = self.get_response(request)
+        # Потоковое тело читает с той же базы, что и представление
+        if response.streaming:
+            response.streaming_content = within(
+                lambda: read_state(state), response.streaming_content
+            )
+        if state.wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_LAG,
+                httponly=True, samesite='Lax'
+            )
+        return response
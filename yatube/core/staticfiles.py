@@ -0,0 +1,164 @@
+"""Сборка и раздача статики.
+
+CompressedManifestStaticFilesStorage при collectstatic даёт файлам имена
+с хэшем содержимого и кладёт рядом сжатые копии .gz и, если установлен
+пакет brotli, .br. StaticFilesApplication раздаёт собранную статику
+прямо из WSGI: выбирает сжатую копию по Accept-Encoding и отдаёт файлы
+с хэшем в имени с заголовком Cache-Control: immutable.
+"""
+import gzip
+import json
+import mimetypes
+import os
+from wsgiref.headers import Headers
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Текстовые форматы, которые имеет смысл сжимать
+COMPRESSIBLE = (
+    '.css', '.js', '.map', '.svg', '.ico', '.txt', '.json', '.xml', '.html'
+)
+# Файлы меньше этого размера не сжимаются: выигрыша нет
+MIN_COMPRESS_SIZE = 256
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Файлы без хэша в имени могут измениться при следующей сборке
+SHORT_LIVED = 'public, max-age=60'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def compress_file(path):
+    """Пишет рядом с файлом сжатые копии, если они меньше исходника."""
+    with open(path, 'rb') as source:
+        content = source.read()
+    variants = [('.gz', gzip.compress(content, 9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(content)))
+    for suffix, compressed in variants:
+        if len(compressed) < len(content):
+            with open(path + suffix, 'wb') as target:
+                target.write(compressed)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for root, _, files in os.walk(self.location):
+            for name in files:
+                path = os.path.join(root, name)
+                if (
+                    name.endswith(COMPRESSIBLE)
+                    and os.path.getsize(path) >= MIN_COMPRESS_SIZE
+                ):
+                    compress_file(path)
+
+
+class StaticFile:
+    def __init__(self, path, immutable):
+        self.path = path
+        self.content_type = (
+            mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        )
+        self.cache_control = IMMUTABLE if immutable else SHORT_LIVED
+        stat = os.stat(path)
+        self.size = stat.st_size
+        self.etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+        self.variants = {
+            encoding: (path + suffix, os.path.getsize(path + suffix))
+            for encoding, suffix in ENCODINGS
+            if os.path.exists(path + suffix)
+        }
+
+    def choose(self, accept_encoding):
+        """Путь к лучшей копии для клиента, её размер и
+        Content-Encoding."""
+        accepted = {
+            part.split(';')[0].strip() for part in accept_encoding.split(',')
+        }
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and encoding in self.variants:
+                return (*self.variants[encoding], encoding)
+        return self.path, self.size, None
+
+
+class StaticFilesApplication:
+    """WSGI-обёртка, которая раздаёт файлы из root по адресам prefix.
+    Список файлов читается один раз при старте, поэтому запрос к статике
+    не трогает файловую систему, пока не начнёт отдавать файл."""
+
+    def __init__(self, application, root, prefix):
+        self.application = application
+        self.prefix = '/' + prefix.strip('/') + '/'
+        self.files = self.scan(root)
+
+    @staticmethod
+    def scan(root):
+        try:
+            with open(os.path.join(root, 'staticfiles.json')) as manifest:
+                hashed = set(json.load(manifest)['paths'].values())
+        except (OSError, ValueError, KeyError):
+            hashed = set()
+        suffixes = tuple(suffix for _, suffix in ENCODINGS)
+        files = {}
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if name.endswith(suffixes):
+                    continue
+                path = os.path.join(directory, name)
+                url = os.path.relpath(path, root).replace(os.sep, '/')
+                files[url] = StaticFile(path, url in hashed)
+        return files
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        static_file = None
+        if path.startswith(self.prefix):
+            static_file = self.files.get(path[len(self.prefix):])
+        if static_file is None:
+            return self.application(environ, start_response)
+        return self.serve(static_file, environ, start_response)
+
+    def serve(self, static_file, environ, start_response):
+        method = environ['REQUEST_METHOD']
+        if method not in ('GET', 'HEAD'):
+            start_response('405 Method Not Allowed', [('Allow', 'GET, HEAD')])
+            return []
+        path, size, encoding = static_file.choose(
+            environ.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        # У каждой сжатой копии свой ETag: это разные представления
+        etag = static_file.etag
+        if encoding:
+            etag = f'{etag[:-1]}-{encoding}"'
+        headers = Headers([
+            ('Cache-Control', static_file.cache_control),
+            ('Vary', 'Accept-Encoding'),
+            ('ETag', etag),
+        ])
+        if environ.get('HTTP_IF_NONE_MATCH') == etag:
+            start_response('304 Not Modified', headers.items())
+            return []
+        headers['Content-Type'] = static_file.content_type
+        headers['Content-Length'] = str(size)
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        start_response('200 OK', headers.items())
+        if method == 'HEAD':
+            return []
+        content = open(path, 'rb')
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if file_wrapper is not None:
+            return file_wrapper(content, CHUNK_SIZE)
+        return read_chunks(content)
+
+
+def read_chunks(content):
+    with content:
+        yield from iter(lambda: content.read(CHUNK_SIZE), b'')
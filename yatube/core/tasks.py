@@ -0,0 +1,195 @@
+"""Очередь фоновых задач в базе данных.
+
+enqueue() пишет строку Task в текущей транзакции: задача появится
+у обработчика только после коммита и пропадёт вместе с откатом.
+Обработчик - manage.py run_tasks - забирает готовые задачи, выполняет
+их в пуле потоков и повторяет упавшие с растущей задержкой.
+"""
+import json
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# Имя задачи -> функция; заполняется декоратором task в модулях
+# tasks.py приложений, которые CoreConfig загружает при старте
+TASKS = {}
+# SQLite допускает одного пишущего: задачи из потоков одного обработчика
+# пишут в базу по очереди, иначе они падают с database is locked
+SQLITE_WRITE_LOCK = threading.RLock()
+
+
+def task_name(func):
+    return f'{func.__module__}.{func.__name__}'
+
+
+def task(func=None, *, atomic=True):
+    """Регистрирует функцию как задачу и добавляет ей func.enqueue().
+    Задача выполняется в транзакции; с atomic=False - без неё, например
+    если она ходит в сеть и не должна держать транзакцию открытой."""
+    if func is None:
+        return partial(task, atomic=atomic)
+    func.atomic = atomic
+    TASKS[task_name(func)] = func
+    func.enqueue = partial(enqueue, func)
+    return func
+
+
+@contextmanager
+def write_lock():
+    """Пускает потоки обработчика писать в SQLite по одному. Задачи
+    с atomic=False оборачивают в него свои записи в базу."""
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    with SQLITE_WRITE_LOCK:
+        yield
+
+
+def enqueue(func, *args, key=None, delay=None):
+    """Ставит задачу в очередь. Аргументы должны сериализоваться в JSON.
+    Задача с уже известным ключом key не ставится повторно; возвращает
+    False в этом случае."""
+    run_after = timezone.now()
+    if delay:
+        run_after += timedelta(seconds=delay)
+    try:
+        with transaction.atomic():
+            Task.objects.create(
+                name=task_name(func),
+                args=json.dumps(args),
+                key=key,
+                run_after=run_after,
+            )
+    except IntegrityError:
+        if key is None:
+            raise
+        return False
+    return True
+
+
+def due(now):
+    """Готовые задачи и задачи обработчиков, не уложившихся в срок,
+    у которых остались попытки."""
+    return Task.objects.filter(
+        Q(status=Task.PENDING, run_after__lte=now)
+        | Q(status=Task.RUNNING, locked_until__lt=now),
+        attempts__lt=settings.TASK_MAX_ATTEMPTS,
+    )
+
+
+def fail_abandoned(now):
+    """Помечает упавшими задачи, которые TASK_MAX_ATTEMPTS раз не
+    завершил обработчик: например, задачу, убивающую свой процесс."""
+    return Task.objects.filter(
+        status=Task.RUNNING, locked_until__lt=now,
+        attempts__gte=settings.TASK_MAX_ATTEMPTS,
+    ).update(
+        status=Task.FAILED, locked_until=None,
+        last_error='Обработчик не завершил задачу за отведённое время',
+    )
+
+
+def claim(limit):
+    """Забирает до limit готовых задач. Условие в UPDATE не даёт двум
+    обработчикам взять одну задачу."""
+    now = timezone.now()
+    fail_abandoned(now)
+    claimed = []
+    candidates = due(now).values_list('pk', 'status', 'locked_until')
+    for pk, status, locked_until in candidates[:limit]:
+        taken = Task.objects.filter(
+            pk=pk, status=status, locked_until=locked_until
+        ).update(
+            status=Task.RUNNING,
+            locked_until=now + timedelta(
+                seconds=settings.TASK_LOCK_TIMEOUT
+            ),
+            attempts=F('attempts') + 1,
+        )
+        if taken:
+            claimed.append(pk)
+    return list(Task.objects.filter(pk__in=claimed))
+
+
+def retry_delay(attempts):
+    return timedelta(
+        seconds=settings.TASK_RETRY_DELAY * 2 ** (attempts - 1)
+    )
+
+
+def execute(task_row):
+    """Выполняет задачу в транзакции и записывает результат. Упавшая
+    задача повторяется, пока не исчерпает TASK_MAX_ATTEMPTS попыток."""
+    func = TASKS.get(task_row.name)
+    try:
+        if func is None:
+            raise LookupError(f'Задача {task_row.name} не найдена')
+        if func.atomic:
+            with write_lock(), transaction.atomic():
+                func(*json.loads(task_row.args))
+        else:
+            func(*json.loads(task_row.args))
+    except Exception as error:
+        logger.exception('Задача %s упала', task_row)
+        retry = (
+            not isinstance(error, LookupError)
+            and task_row.attempts < settings.TASK_MAX_ATTEMPTS
+        )
+        with write_lock():
+            Task.objects.filter(pk=task_row.pk).update(
+                status=Task.PENDING if retry else Task.FAILED,
+                run_after=timezone.now() + retry_delay(task_row.attempts),
+                locked_until=None,
+                last_error=traceback.format_exc(),
+            )
+        return False
+    with write_lock():
+        Task.objects.filter(pk=task_row.pk).update(
+            status=Task.DONE, locked_until=None, last_error=''
+        )
+    return True
+
+
+def prune(days):
+    """Удаляет выполненные задачи старше days дней; возвращает их
+    число. Ключи удалённых задач можно использовать снова."""
+    cutoff = timezone.now() - timedelta(days=days)
+    with write_lock():
+        deleted, _ = Task.objects.filter(
+            status=Task.DONE, run_after__lt=cutoff
+        ).delete()
+    return deleted
+
+
+def _execute_in_thread(task_row):
+    try:
+        return execute(task_row)
+    finally:
+        connections.close_all()
+
+
+def run_pending(limit=100, workers=1):
+    """Выполняет до limit готовых задач и возвращает их число. С одним
+    обработчиком задачи идут в текущем потоке, иначе - в пуле потоков
+    со своими соединениями с базой."""
+    tasks = claim(limit)
+    if workers == 1:
+        for task_row in tasks:
+            execute(task_row)
+    else:
+        with ThreadPoolExecutor(workers) as pool:
+            list(pool.map(_execute_in_thread, tasks))
+    return len(tasks)
@@ -0,0 +1,94 @@
+"""Прогрев кэша шаблонов.
+
+С кэширующим загрузчиком шаблон читается и разбирается один раз на
+процесс, но этот раз приходится на первый запрос каждого воркера.
+warm_templates() разбирает все шаблоны проекта заранее - при старте
+WSGI-приложения или командой manage.py precompile_templates.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+
+logger = logging.getLogger(__name__)
+
+
+def django_engines():
+    return [
+        engine for engine in engines.all() if hasattr(engine, 'engine')
+    ]
+
+
+def loader_dirs(engine):
+    """Каталоги всех загрузчиков движка, в том числе вложенных
+    в кэширующий загрузчик."""
+    dirs = []
+    for loader in engine.engine.template_loaders:
+        for inner in getattr(loader, 'loaders', [loader]):
+            dirs.extend(
+                str(directory) for directory in inner.get_dirs()
+                if str(directory) not in dirs
+            )
+    return dirs
+
+
+def project_template_dirs(engine):
+    """Каталоги шаблонов проекта - без шаблонов сторонних пакетов."""
+    return [
+        directory for directory in loader_dirs(engine)
+        if os.path.abspath(directory).startswith(settings.BASE_DIR)
+        and os.path.isdir(directory)
+    ]
+
+
+def template_names(directory):
+    for root, _, names in os.walk(directory):
+        for name in sorted(names):
+            yield os.path.relpath(
+                os.path.join(root, name), directory
+            ).replace(os.sep, '/')
+
+
+def uses_cached_loader(engine):
+    return any(
+        hasattr(loader, 'get_template_cache')
+        for loader in engine.engine.template_loaders
+    )
+
+
+def reset_template_caches():
+    for engine in django_engines():
+        for loader in engine.engine.template_loaders:
+            if hasattr(loader, 'reset'):
+                loader.reset()
+
+
+def warm_templates():
+    """Загружает все шаблоны проекта через загрузчики движков.
+    Возвращает число шаблонов и список ошибок разбора."""
+    loaded = 0
+    errors = []
+    for engine in django_engines():
+        for directory in project_template_dirs(engine):
+            for name in template_names(directory):
+                try:
+                    engine.get_template(name)
+                except TemplateSyntaxError as error:
+                    errors.append(f'{name}: {error}')
+                else:
+                    loaded += 1
+    return loaded, errors
+
+
+def warm_templates_on_startup():
+    """Хук для wsgi.py: пишет в лог время прогрева и ошибки шаблонов."""
+    started = time.perf_counter()
+    loaded, errors = warm_templates()
+    for error in errors:
+        logger.error('Шаблон не разобран: %s', error)
+    logger.info(
+        'Разобрано шаблонов: %s за %.1f мс',
+        loaded, (time.perf_counter() - started) * 1000
+    )
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import time
+
+from django.core.wsgi import get_wsgi_application
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from ..asgi import WsgiToAsgi
+
+
+def call(application, scope, body=b'', chunk=4):
+    """Ведёт один запрос к ASGI-приложению, тело приходит частями."""
+    parts = [body[i:i + chunk] for i in range(0, len(body), chunk)] or [b'']
+    incoming = [
+        {'type': 'http.request', 'body': part,
+         'more_body': number < len(parts) - 1}
+        for number, part in enumerate(parts)
+    ]
+    messages = []
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        await application(scope, receive, send)
+    asyncio.run(run())
+    return messages
+
+
+def http_scope(path, method='GET', query_string=b'', headers=()):
+    return {
+        'type': 'http', 'method': method, 'path': path,
+        'query_string': query_string, 'headers': list(headers),
+        'server': ('testserver', 80), 'client': ('10.0.0.1', 5000),
+    }
+
+
+def echo(environ, start_response):
+    start_response('201 Created', [('Content-Type', 'application/json')])
+    data = {
+        key: value for key, value in environ.items()
+        if isinstance(value, str)
+    }
+    data['body'] = environ['wsgi.input'].read().decode()
+    yield b'{"part": 1}\n'
+    yield json.dumps(data).encode()
+
+
+class WsgiToAsgiTest(SimpleTestCase):
+    def test_environ_and_body(self):
+        messages = call(WsgiToAsgi(echo, 2), http_scope(
+            '/group/кот/', 'POST', b'page=2',
+            [(b'content-type', b'text/plain'), (b'x-tag', b'a'),
+             (b'x-tag', b'b'), (b'cookie', b'sessionid=1'),
+             (b'cookie', b'csrftoken=2')],
+        ), body=b'text=hello')
+        start, first, second, last = messages
+        self.assertEqual(start['status'], 201)
+        self.assertIn(
+            (b'content-type', b'application/json'), start['headers']
+        )
+        self.assertTrue(first['more_body'])
+        self.assertFalse(last['more_body'])
+        environ = json.loads(second['body'])
+        self.assertEqual(environ['REQUEST_METHOD'], 'POST')
+        self.assertEqual(
+            environ['PATH_INFO'].encode('latin-1').decode(), '/group/кот/'
+        )
+        self.assertEqual(environ['QUERY_STRING'], 'page=2')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_X_TAG'], 'a,b')
+        self.assertEqual(
+            environ['HTTP_COOKIE'], 'sessionid=1; csrftoken=2'
+        )
+        self.assertEqual(environ['REMOTE_ADDR'], '10.0.0.1')
+        self.assertEqual(environ['body'], 'text=hello')
+
+    def test_django_page(self):
+        messages = call(
+            WsgiToAsgi(get_wsgi_application(), 2),
+            http_scope(reverse('about:author'),
+                       headers=[(b'host', b'testserver')]),
+        )
+        self.assertEqual(messages[0]['status'], 200)
+        body = b''.join(message.get('body', b'') for message in messages)
+        self.assertIn(b'<html', body)
+
+    def test_slow_requests_run_concurrently(self):
+        def slow(environ, start_response):
+            time.sleep(0.05)
+            start_response('200 OK', [])
+            return [b'ok']
+
+        async def burst(application):
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                application(http_scope('/'), receive, send)
+                for _ in range(8)
+            ))
+            return time.perf_counter() - started
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            pass
+
+        single = asyncio.run(burst(WsgiToAsgi(slow, 1)))
+        pooled = asyncio.run(burst(WsgiToAsgi(slow, 8)))
+        self.assertGreater(single, 0.4)
+        self.assertLess(pooled, single / 2)
+
+    def test_lifespan(self):
+        incoming = [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}
+        ]
+        messages = []
+
+        async def receive():
+            return incoming.pop(0)
+
+        async def send(message):
+            messages.append(message['type'])
+
+        asyncio.run(WsgiToAsgi(echo, 1)({'type': 'lifespan'}, receive, send))
+        self.assertEqual(messages, [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete'
+        ])
@@ -0,0 +1,146 @@
+import os
+import shutil
+import tempfile
+import threading
+
+from django.db import OperationalError
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, override_settings
+
+WAL_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 1024 * 1024,
+}
+WRITERS = 4
+POSTS_PER_WRITER = 25
+
+
+class SQLitePragmasTest(SimpleTestCase):
+    """Соединения с отдельной базой в файле: тестовая база SQLite живёт
+    в памяти, а WAL работает только с файлом."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        database = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(directory, 'db.sqlite3'),
+            'OPTIONS': {'timeout': 0.1},
+        }
+        self.connections = ConnectionHandler({
+            'default': database, 'writer': dict(database)
+        })
+        self.addCleanup(self.connections.close_all)
+
+    def create_table(self):
+        with self.connections['default'].cursor() as cursor:
+            cursor.execute(
+                'CREATE TABLE post (id integer PRIMARY KEY, text text)'
+            )
+
+    def count(self, cursor):
+        cursor.execute('SELECT count(*) FROM post')
+        return cursor.fetchone()[0]
+
+    def write_while_reading(self):
+        """Пишет пост, пока другое соединение держит открытое чтение.
+        Возвращает число постов, которое видит читатель до и после."""
+        self.create_table()
+        with self.connections['default'].cursor() as cursor:
+            cursor.execute('BEGIN')
+            before = self.count(cursor)
+            with self.connections['writer'].cursor() as write_cursor:
+                write_cursor.execute("INSERT INTO post (text) VALUES ('x')")
+            snapshot = self.count(cursor)
+            cursor.execute('COMMIT')
+            return before, snapshot, self.count(cursor)
+
+    def read_while_writing(self):
+        """Читает, пока другое соединение коммитит пост и держит
+        исключительную блокировку."""
+        self.create_table()
+        with self.connections['writer'].cursor() as write_cursor:
+            write_cursor.execute('BEGIN EXCLUSIVE')
+            write_cursor.execute("INSERT INTO post (text) VALUES ('x')")
+            try:
+                with self.connections['default'].cursor() as cursor:
+                    return self.count(cursor)
+            finally:
+                write_cursor.execute('COMMIT')
+
+    @override_settings(SQLITE_PRAGMAS=WAL_PRAGMAS)
+    def test_pragmas_are_applied_to_new_connections(self):
+        with self.connections['default'].cursor() as cursor:
+            values = []
+            for name in WAL_PRAGMAS:
+                cursor.execute(f'PRAGMA {name}')
+                values.append(cursor.fetchone()[0])
+        # synchronous читается числом: NORMAL = 1
+        self.assertEqual(values, ['wal', 1, 5000, 1024 * 1024])
+
+    @override_settings(SQLITE_PRAGMAS={})
+    def test_rollback_journal_writer_waits_for_reader(self):
+        with self.assertRaisesMessage(OperationalError, 'locked'):
+            self.write_while_reading()
+
+    @override_settings(SQLITE_PRAGMAS=WAL_PRAGMAS)
+    def test_wal_writer_does_not_wait_for_reader(self):
+        """Читатель видит свой снимок, пишущий коммитит не дожидаясь его"""
+        self.assertEqual(self.write_while_reading(), (0, 0, 1))
+
+    @override_settings(SQLITE_PRAGMAS={})
+    def test_rollback_journal_reader_waits_for_writer(self):
+        with self.assertRaisesMessage(OperationalError, 'locked'):
+            self.read_while_writing()
+
+    @override_settings(SQLITE_PRAGMAS=WAL_PRAGMAS)
+    def test_wal_reader_does_not_wait_for_writer(self):
+        """Читатель не ждёт коммита и видит пока пустую таблицу"""
+        self.assertEqual(self.read_while_writing(), 0)
+
+    def in_thread(self, work):
+        """Выполняет work(cursor) в своём соединении и собирает ошибки."""
+        try:
+            with self.connections['default'].cursor() as cursor:
+                work(cursor)
+        except OperationalError as error:
+            self.errors.append(error)
+        finally:
+            self.connections['default'].close()
+
+    def publish(self, cursor):
+        for _ in range(POSTS_PER_WRITER):
+            cursor.execute("INSERT INTO post (text) VALUES ('x')")
+
+    def read_feed(self, cursor):
+        while self.writing.is_set():
+            self.count(cursor)
+
+    @override_settings(SQLITE_PRAGMAS=WAL_PRAGMAS)
+    def test_readers_during_post_burst(self):
+        """Публикации из нескольких потоков и читатели ленты
+        работают одновременно без ошибок блокировки"""
+        self.create_table()
+        self.errors = []
+        self.writing = threading.Event()
+        self.writing.set()
+        readers = [
+            threading.Thread(target=self.in_thread, args=(self.read_feed,))
+            for _ in range(WRITERS)
+        ]
+        writers = [
+            threading.Thread(target=self.in_thread, args=(self.publish,))
+            for _ in range(WRITERS)
+        ]
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        self.writing.clear()
+        for thread in readers:
+            thread.join()
+        self.assertEqual(self.errors, [])
+        with self.connections['default'].cursor() as cursor:
+            self.assertEqual(self.count(cursor), WRITERS * POSTS_PER_WRITER)
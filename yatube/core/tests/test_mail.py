@@ -0,0 +1,155 @@
+import socketserver
+import threading
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.mail import send_mail
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import OutgoingEmail, Task
+from ..mail import claim_emails, deliver_emails
+from ..tasks import run_pending
+
+User = get_user_model()
+PASSWORD_RESET_URL = reverse('password_reset')
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Минимальный SMTP: принимает письма или отклоняет первые
+    server.fail_messages из них временной ошибкой 451."""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def read_data(self):
+        lines = []
+        for line in iter(self.rfile.readline, b''):
+            if line == b'.\r\n':
+                break
+            lines.append(line)
+        return b''.join(lines)
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply('220 localhost')
+        for line in iter(self.rfile.readline, b''):
+            command = line.decode().strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250 localhost')
+            elif command.startswith(('MAIL', 'RCPT', 'RSET', 'NOOP')):
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = self.read_data()
+                if server.fail_messages:
+                    server.fail_messages -= 1
+                    self.reply('451 Try again later')
+                else:
+                    server.messages.append(data)
+                    self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.connections = 0
+        self.fail_messages = 0
+        self.messages = []
+
+
+class QueuedEmailTest(TestCase):
+    def setUp(self):
+        self.server = SMTPStandIn()
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        settings = override_settings(
+            EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+            EMAIL_DELIVERY_BACKEND=(
+                'django.core.mail.backends.smtp.EmailBackend'
+            ),
+            EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=self.server.server_address[1],
+            EMAIL_BATCH_DELAY=60 * 60,
+            EMAIL_BATCH_SIZE=7,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def deliver_now(self):
+        Task.objects.update(run_after=timezone.now())
+        return run_pending()
+
+    def send(self, count):
+        for number in range(count):
+            send_mail(
+                f'Письмо {number}', 'Текст', 'yatube@example.com',
+                [f'reader{number}@example.com']
+            )
+
+    def test_password_reset_does_not_wait_for_delivery(self):
+        """Сброс пароля только ставит письмо в очередь"""
+        User.objects.create_user('reader', 'reader@example.com', 'pass')
+        response = Client().post(
+            PASSWORD_RESET_URL, {'email': 'reader@example.com'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.server.connections, 0)
+        self.assertEqual(OutgoingEmail.objects.count(), 1)
+        self.assertEqual(run_pending(), 0)
+        self.assertEqual(self.deliver_now(), 1)
+        self.assertEqual(len(self.server.messages), 1)
+        self.assertIn(b'reader@example.com', self.server.messages[0])
+
+    def test_batch_is_sent_over_one_connection(self):
+        """Письма из очереди уходят одной задачей через одно соединение"""
+        self.send(30)
+        self.assertEqual(Task.objects.count(), 1)
+        self.deliver_now()
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(len(self.server.messages), 30)
+        self.assertFalse(OutgoingEmail.objects.filter(sent_at=None))
+
+    def test_failed_letters_are_retried(self):
+        """Отклонённые письма повторяются, отправленные - нет"""
+        self.server.fail_messages = 2
+        self.send(10)
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.deliver_now()
+        self.assertEqual(len(self.server.messages), 8)
+        failed = OutgoingEmail.objects.filter(sent_at=None)
+        self.assertEqual(failed.count(), 2)
+        self.assertTrue(all(email.attempts == 1 for email in failed))
+        self.assertEqual(Task.objects.get().status, Task.PENDING)
+        self.deliver_now()
+        self.assertEqual(len(self.server.messages), 10)
+        self.assertEqual(self.server.connections, 2)
+        self.assertEqual(Task.objects.get().status, Task.DONE)
+
+    def test_claimed_letters_are_not_sent_twice(self):
+        """Письма, которые забрала другая задача доставки, не уходят
+        повторно, пока не истечёт срок её метки"""
+        self.send(10)
+        _, taken = claim_emails(0)
+        self.assertEqual(len(taken), 7)
+        deliver_emails()
+        self.assertEqual(len(self.server.messages), 3)
+        self.assertIsNone(claim_emails(0))
+        OutgoingEmail.objects.filter(sent_at=None).update(
+            claimed_until=timezone.now() - timedelta(seconds=1)
+        )
+        deliver_emails()
+        self.assertEqual(len(self.server.messages), 10)
+        self.assertFalse(OutgoingEmail.objects.filter(sent_at=None))
@@ -0,0 +1,163 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..metrics import AGGREGATE, MetricsStore, collect, exposition
+
+MAIN_URL = reverse('posts:index')
+METRICS_URL = reverse('metrics')
+# Заведомо несуществующий процесс
+DEAD_PID = 2 ** 22 + 1
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings = override_settings(
+            METRICS_DIR=self.directory, METRICS_FLUSH_INTERVAL=60
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def metrics(self):
+        response = Client().get(METRICS_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        return response.content.decode()
+
+    def test_requests_are_counted_by_view_name(self):
+        for _ in range(2):
+            Client().get(MAIN_URL)
+        Client().get('/no-such-page/')
+        content = self.metrics()
+        self.assertIn(
+            'yatube_http_requests_total'
+            '{view="posts:index",method="GET",status="200"} 2', content
+        )
+        self.assertIn(
+            'yatube_http_requests_total'
+            '{view="<unresolved>",method="GET",status="404"} 1', content
+        )
+        self.assertIn('# TYPE yatube_http_request_duration_seconds histogram',
+                      content)
+        self.assertIn(
+            'yatube_http_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 2', content
+        )
+        self.assertIn(
+            'yatube_http_request_duration_seconds_count'
+            '{view="posts:index"} 2', content
+        )
+
+    def test_db_cache_and_memory_metrics(self):
+        Client().get(MAIN_URL)
+        content = self.metrics()
+        self.assertIn(
+            'yatube_db_query_duration_seconds_count{alias="default"}',
+            content
+        )
+        self.assertIn(
+            'yatube_db_queries_per_request_bucket'
+            '{view="posts:index",le="0"} 0', content
+        )
+        self.assertIn(
+            'yatube_cache_requests_total{cache="default",result="miss"}',
+            content
+        )
+        self.assertIn(
+            f'yatube_process_resident_memory_bytes{{pid="{os.getpid()}"}}',
+            content
+        )
+
+    @override_settings(METRICS_DIR=None)
+    def test_disabled_without_directory(self):
+        self.assertEqual(Client().get(METRICS_URL).status_code, 404)
+
+    @override_settings(METRICS_ALLOWED_IPS=('10.0.0.1',), METRICS_TOKEN='s')
+    def test_access_is_restricted(self):
+        """Страница открыта разрешённым адресам и по токену"""
+        cases = {
+            ('127.0.0.1', ''): 404,
+            ('127.0.0.1', 'Bearer wrong'): 404,
+            ('127.0.0.1', 'Bearer s'): 200,
+            ('10.0.0.1', ''): 200,
+        }
+        for (address, authorization), status in cases.items():
+            with self.subTest(address=address, authorization=authorization):
+                response = Client().get(
+                    METRICS_URL, REMOTE_ADDR=address,
+                    HTTP_AUTHORIZATION=authorization
+                )
+                self.assertEqual(response.status_code, status)
+
+
+class MetricsAggregationTest(TestCase):
+    def test_workers_are_summed_and_dead_workers_have_no_memory(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        labels = (('view', 'posts:index'),)
+        live = MetricsStore(directory)
+        live.inc('yatube_http_requests_total', labels, 3)
+        live.observe('yatube_http_request_duration_seconds', labels,
+                     0.02, (0.01, 0.1))
+        live.flush(force=True)
+        dead = live.snapshot()
+        dead['pid'] = DEAD_PID
+        with open(os.path.join(directory, f'{DEAD_PID}.json'), 'w') as file:
+            json.dump(dead, file)
+        content = exposition(*collect(directory))
+        self.assertIn(
+            'yatube_http_requests_total{view="posts:index"} 6', content
+        )
+        self.assertIn(
+            'yatube_http_request_duration_seconds_bucket'
+            '{view="posts:index",le="0.01"} 0', content
+        )
+        self.assertIn(
+            'yatube_http_request_duration_seconds_bucket'
+            '{view="posts:index",le="0.1"} 2', content
+        )
+        self.assertIn(
+            'yatube_http_request_duration_seconds_sum{view="posts:index"} '
+            '0.04', content
+        )
+        self.assertNotIn(f'pid="{DEAD_PID}"', content)
+
+    def test_dead_workers_are_merged_into_aggregate(self):
+        """Файл завершившегося процесса переносится в общий итог, новый
+        процесс с тем же pid его не затирает"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        labels = (('view', 'posts:index'),)
+        store = MetricsStore(directory)
+        store.inc('yatube_http_requests_total', labels, 2)
+        dead = store.snapshot()
+        dead['pid'] = DEAD_PID
+        with open(os.path.join(directory, f'{DEAD_PID}.json'), 'w') as file:
+            json.dump(dead, file)
+        store.flush(force=True)
+        for _ in range(2):
+            content = exposition(*collect(directory))
+            self.assertIn(
+                'yatube_http_requests_total{view="posts:index"} 4', content
+            )
+        self.assertEqual(
+            sorted(name for name in os.listdir(directory)
+                   if name.endswith('.json')),
+            sorted([AGGREGATE, f'{os.getpid()}.json'])
+        )
+        # Перезапуск с тем же pid: прежние счётчики остаются в итоге
+        restarted = MetricsStore(directory)
+        restarted.inc('yatube_http_requests_total', labels)
+        restarted.flush(force=True)
+        self.assertIn(
+            'yatube_http_requests_total{view="posts:index"} 5',
+            exposition(*collect(directory))
+        )
@@ -0,0 +1,87 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..instrumentation import profile
+
+User = get_user_model()
+MAIN_URL = reverse('posts:index')
+
+
+@override_settings(
+    PROFILING_SAMPLE_RATE=1, PROFILING_SERVER_TIMING=True,
+    FEED_CACHE_TIMEOUT=60
+)
+class ProfilingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.staff)
+
+    def get_profiled(self, url, client=None):
+        with self.assertLogs('core.profiling') as logs:
+            response = (client or self.client).get(url)
+        return response, json.loads(logs.records[-1].getMessage())
+
+    def test_profile_is_logged_and_sent_in_server_timing(self):
+        response, record = self.get_profiled(MAIN_URL)
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['sql_count'], 0)
+        self.assertIn('posts/index.html', record['templates'])
+        timing = response['Server-Timing']
+        self.assertTrue(timing.startswith('total;dur='))
+        self.assertIn(f'{record["sql_count"]} queries', timing)
+        self.assertIn('desc="posts/index.html"', timing)
+
+    def test_cache_hits_are_counted(self):
+        guest = Client()
+        _, first = self.get_profiled(MAIN_URL, guest)
+        _, second = self.get_profiled(MAIN_URL, guest)
+        self.assertGreater(first['cache_misses'], 0)
+        self.assertEqual(second['cache_hit_ratio'], 1)
+        self.assertEqual(second['sql_count'], 0)
+
+    @override_settings(PROFILING_SERVER_TIMING=False)
+    def test_server_timing_can_be_disabled(self):
+        response, _ = self.get_profiled(MAIN_URL)
+        self.assertNotIn('Server-Timing', response)
+
+    def test_server_timing_is_sent_only_to_staff(self):
+        response, _ = self.get_profiled(MAIN_URL, Client())
+        self.assertNotIn('Server-Timing', response)
+        with self.settings(DEBUG=True):
+            response, _ = self.get_profiled(MAIN_URL, Client())
+        self.assertIn('Server-Timing', response)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_disabled_by_default(self):
+        self.assertNotIn('Server-Timing', Client().get(MAIN_URL))
+
+
+class ProfileTest(TestCase):
+    def test_repeated_queries_are_detected(self):
+        """Одинаковый SQL с разными параметрами - похожие запросы,
+        с теми же параметрами - дубли"""
+        users = [User.objects.create(username=f'user{n}') for n in range(3)]
+        with profile() as stats:
+            for user in users:
+                User.objects.get(pk=user.pk)
+            User.objects.get(pk=users[0].pk)
+        self.assertEqual(list(stats.similar_queries(3).values()), [4])
+        self.assertEqual(list(stats.duplicate_queries().values()), [2])
+        self.assertGreater(stats.sql_time, 0)
+
+    def test_profile_restores_cache_methods(self):
+        with profile() as stats:
+            cache.get('missing')
+        cache.get('missing')
+        self.assertEqual(stats.cache_misses, 1)
+        self.assertNotIn('get', vars(caches['default']))
@@ -0,0 +1,119 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import (
+    Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Post
+
+from ..routers import PIN_COOKIE, ReplicaMiddleware
+
+User = get_user_model()
+MAIN_URL = reverse('posts:index')
+NEW_POST_URL = reverse('posts:post_create')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_LAG=5)
+class ReplicaRouterTest(SimpleTestCase):
+    def request(self, method='get', write=False, **cookies):
+        """Пропускает запрос через ReplicaMiddleware и возвращает ответ
+        и базы, выбранные для чтения постов и пользователей."""
+        databases = []
+
+        def view(request):
+            if write:
+                router.db_for_write(Post)
+            databases.extend(
+                router.db_for_read(model) for model in (Post, User)
+            )
+            return HttpResponse()
+        request = getattr(RequestFactory(), method)('/')
+        request.COOKIES.update(cookies)
+        return ReplicaMiddleware(view)(request), databases
+
+    def test_get_reads_posts_from_replica(self):
+        response, databases = self.request()
+        self.assertEqual(databases, ['replica', 'default'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_write_pins_user_to_primary(self):
+        """После записи запрос и следующие REPLICA_LAG секунд читают
+        с основной базы"""
+        response, databases = self.request('post', write=True)
+        self.assertEqual(databases, ['default', 'default'])
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+        _, databases = self.request(**{PIN_COOKIE: '1'})
+        self.assertEqual(databases, ['default', 'default'])
+
+    def test_reads_after_write_in_get_go_to_primary(self):
+        _, databases = self.request(write=True)
+        self.assertEqual(databases, ['default', 'default'])
+
+    def test_streamed_body_reads_from_replica(self):
+        """Тело потокового ответа собирается после выхода из middleware,
+        но читает с той же базы, что и представление"""
+        def chunks():
+            yield router.db_for_read(Post)
+        response = ReplicaMiddleware(
+            lambda request: StreamingHttpResponse(chunks())
+        )(RequestFactory().get('/'))
+        self.assertEqual(list(response.streaming_content), [b'replica'])
+
+    def test_writes_and_reads_outside_requests_use_primary(self):
+        post = Post()
+        post._state.db = 'replica'
+        self.assertEqual(router.db_for_write(Post, instance=post), 'default')
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_no_cookie(self):
+        response, databases = self.request('post', write=True)
+        self.assertEqual(databases, ['default', 'default'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
+        self.assertTrue(router.allow_migrate('default', 'posts'))
+
+
+# Основная база в роли реплики: тестовая база одна
+@override_settings(DATABASE_REPLICAS=['default'], REPLICA_LAG=60)
+class ReplicaLagCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='testauthor_1')
+
+    def setUp(self):
+        cache.clear()
+        self.author = Client()
+        self.author.force_login(self.user)
+
+    def edit_without_signals(self):
+        """update() не сбрасывает кэш лент: видно, взята ли страница
+        из него"""
+        Post.objects.update(text_html='Правка', updated=timezone.now())
+
+    def test_page_from_lagging_replica_is_not_cached(self):
+        """Сразу после нового поста лента с реплики не кэшируется
+        и уходит без валидаторов"""
+        self.author.post(NEW_POST_URL, {'text': 'Новый пост'})
+        response = Client().get(MAIN_URL)
+        self.assertNotIn('ETag', response)
+        self.edit_without_signals()
+        self.assertContains(Client().get(MAIN_URL), 'Правка')
+
+    @override_settings(REPLICA_LAG=0)
+    def test_page_is_cached_once_replica_caught_up(self):
+        self.author.post(NEW_POST_URL, {'text': 'Новый пост'})
+        self.assertIn('ETag', Client().get(MAIN_URL))
+        self.edit_without_signals()
+        self.assertContains(Client().get(MAIN_URL), 'Новый пост')
+
+    def test_author_reads_primary_after_post(self):
+        response = self.author.post(NEW_POST_URL, {'text': 'Новый пост'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertContains(self.author.get(MAIN_URL), 'Новый пост')
@@ -0,0 +1,121 @@
+import json
+import os
+import shutil
+import tempfile
+from wsgiref.util import setup_testing_defaults
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from ..checks import (
+    check_duplicate_static_includes, duplicate_static_includes
+)
+from ..staticfiles import IMMUTABLE, SHORT_LIVED, StaticFilesApplication
+
+STATIC_ROOT = tempfile.mkdtemp()
+CSS = 'admin/css/base.css'
+
+
+def fallback(environ, start_response):
+    start_response('404 Not Found', [])
+    return [b'django']
+
+
+@override_settings(
+    STATIC_ROOT=STATIC_ROOT,
+    STATICFILES_STORAGE=(
+        'core.staticfiles.CompressedManifestStaticFilesStorage'
+    ),
+)
+class StaticPipelineTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(STATIC_ROOT, 'staticfiles.json')) as manifest:
+            cls.hashed_css = json.load(manifest)['paths'][CSS]
+        cls.application = StaticFilesApplication(
+            fallback, STATIC_ROOT, '/static/'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(STATIC_ROOT, ignore_errors=True)
+
+    def get(self, path, **headers):
+        environ = {'PATH_INFO': path, **headers}
+        setup_testing_defaults(environ)
+        response = {}
+
+        def start_response(status, headers):
+            response['status'] = status
+            response['headers'] = dict(headers)
+        body = b''.join(self.application(environ, start_response))
+        return response['status'], response['headers'], body
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        self.assertNotEqual(self.hashed_css, CSS)
+        path = os.path.join(STATIC_ROOT, self.hashed_css)
+        self.assertTrue(os.path.exists(path + '.gz'))
+        self.assertLess(
+            os.path.getsize(path + '.gz'), os.path.getsize(path)
+        )
+
+    def test_hashed_file_is_immutable_and_compressed(self):
+        status, headers, body = self.get(
+            f'/static/{self.hashed_css}', HTTP_ACCEPT_ENCODING='gzip, br'
+        )
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(headers['Cache-Control'], IMMUTABLE)
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(headers['Content-Length'], str(len(body)))
+        self.assertTrue(body.startswith(b'\x1f\x8b'))
+
+    def test_plain_file_for_clients_without_compression(self):
+        status, headers, body = self.get(f'/static/{self.hashed_css}')
+        self.assertNotIn('Content-Encoding', headers)
+        with open(os.path.join(STATIC_ROOT, self.hashed_css), 'rb') as css:
+            self.assertEqual(body, css.read())
+
+    def test_unhashed_name_is_short_lived(self):
+        _, headers, _ = self.get(f'/static/{CSS}')
+        self.assertEqual(headers['Cache-Control'], SHORT_LIVED)
+
+    def test_etag_revalidation(self):
+        _, headers, _ = self.get(
+            f'/static/{self.hashed_css}', HTTP_ACCEPT_ENCODING='gzip'
+        )
+        status, _, body = self.get(
+            f'/static/{self.hashed_css}',
+            HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=headers['ETag'],
+        )
+        self.assertEqual((status, body), ('304 Not Modified', b''))
+
+    def test_other_paths_go_to_django(self):
+        for path in ('/', '/static/missing.css'):
+            with self.subTest(path=path):
+                self.assertEqual(self.get(path)[2], b'django')
+
+
+class DuplicateStaticIncludesCheckTest(SimpleTestCase):
+    def test_duplicate_include_is_reported(self):
+        template_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, template_dir)
+        path = os.path.join(template_dir, 'page.html')
+        with open(path, 'w') as template:
+            template.write(
+                "{% load static %}"
+                "<link href=\"{% static 'css/site.css' %}\">"
+                "<link href={% static \"css/site.css\"%}>"
+                "<img src=\"{% static 'img/logo.png' %}\">"
+            )
+        self.assertEqual(
+            duplicate_static_includes([template_dir]),
+            [(path, {'css/site.css': 2})]
+        )
+
+    def test_project_templates_have_no_duplicates(self):
+        self.assertEqual(check_duplicate_static_includes(None), [])
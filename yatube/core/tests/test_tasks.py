@@ -0,0 +1,115 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import Task
+from ..tasks import run_pending, task
+
+CALLS = []
+
+
+@task
+def remember(value):
+    CALLS.append(value)
+
+
+@task
+def explode():
+    raise ValueError('Ошибка задачи')
+
+
+class TaskQueueTest(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_task_runs_once(self):
+        """Задача выполняется обработчиком и помечается выполненной"""
+        remember.enqueue(1)
+        self.assertEqual(CALLS, [])
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(CALLS, [1])
+        self.assertEqual(Task.objects.get().status, Task.DONE)
+        self.assertEqual(run_pending(), 0)
+
+    def test_rolled_back_task_is_not_queued(self):
+        """Задача из откаченной транзакции не попадает в очередь"""
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            remember.enqueue(1)
+            raise RuntimeError
+        self.assertFalse(Task.objects.exists())
+
+    def test_idempotency_key(self):
+        """Задача с уже известным ключом не ставится повторно"""
+        self.assertTrue(remember.enqueue(1, key='remember:1'))
+        self.assertFalse(remember.enqueue(1, key='remember:1'))
+        run_pending()
+        self.assertFalse(remember.enqueue(1, key='remember:1'))
+        self.assertEqual(CALLS, [1])
+
+    @override_settings(TASK_MAX_ATTEMPTS=2, TASK_RETRY_DELAY=60)
+    def test_failed_task_is_retried_with_backoff(self):
+        explode.enqueue()
+        with self.assertLogs('core.tasks', 'ERROR'):
+            run_pending()
+        failed = Task.objects.get()
+        self.assertEqual(failed.status, Task.PENDING)
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn('Ошибка задачи', failed.last_error)
+        self.assertGreater(failed.run_after, timezone.now())
+        self.assertEqual(run_pending(), 0)
+        Task.objects.update(run_after=timezone.now())
+        with self.assertLogs('core.tasks', 'ERROR'):
+            run_pending()
+        failed.refresh_from_db()
+        self.assertEqual(failed.status, Task.FAILED)
+        self.assertEqual(failed.attempts, 2)
+
+    def test_stale_running_task_is_taken_again(self):
+        """Задачу упавшего обработчика забирает другой"""
+        remember.enqueue(1)
+        Task.objects.update(
+            status=Task.RUNNING,
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(CALLS, [1])
+
+    @override_settings(TASK_MAX_ATTEMPTS=2)
+    def test_abandoned_task_fails_after_max_attempts(self):
+        """Задача, которую обработчик ни разу не завершил, не забирается
+        бесконечно"""
+        remember.enqueue(1)
+        Task.objects.update(
+            status=Task.RUNNING, attempts=2,
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(run_pending(), 0)
+        self.assertEqual(CALLS, [])
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+
+    def test_old_done_tasks_are_pruned(self):
+        for value in range(3):
+            remember.enqueue(value)
+        run_pending()
+        Task.objects.filter(args='[0]').update(
+            run_after=timezone.now() - timedelta(days=8)
+        )
+        call_command(
+            'run_tasks', '--once', '--workers=1', '--prune-older-than=7',
+            stdout=StringIO()
+        )
+        self.assertEqual(
+            sorted(Task.objects.values_list('args', flat=True)),
+            ['[1]', '[2]']
+        )
+
+    def test_run_tasks_command(self):
+        for value in range(3):
+            remember.enqueue(value)
+        call_command('run_tasks', '--once', '--workers=1', stdout=StringIO())
+        self.assertEqual(sorted(CALLS), [0, 1, 2])
+        self.assertFalse(Task.objects.exclude(status=Task.DONE).exists())
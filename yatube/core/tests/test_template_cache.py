@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.template import engines
+from django.test import SimpleTestCase, override_settings
+
+from ..template_cache import (
+    django_engines, project_template_dirs, uses_cached_loader, warm_templates
+)
+
+CACHED_LOADER = [(
+    'django.template.loaders.cached.Loader',
+    ['django.template.loaders.filesystem.Loader'],
+)]
+
+
+def cached_templates(directory):
+    return override_settings(TEMPLATES=[{
+        **settings.TEMPLATES[0],
+        'DIRS': [directory],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            **settings.TEMPLATES[0]['OPTIONS'],
+            'loaders': CACHED_LOADER,
+        },
+    }])
+
+
+class TemplateCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.template_dir = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.template_dir)
+        os.mkdir(os.path.join(self.template_dir, 'posts'))
+        self.write('base.html', '<main>{% block main %}{% endblock %}</main>')
+        self.write(
+            'posts/page.html',
+            "{% extends 'base.html' %}{% block main %}{{ text }}{% endblock %}"
+        )
+        settings_override = cached_templates(self.template_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def write(self, name, content):
+        with open(os.path.join(self.template_dir, name), 'w') as template:
+            template.write(content)
+
+    def test_project_templates_are_found_through_cached_loader(self):
+        engine, = django_engines()
+        self.assertTrue(uses_cached_loader(engine))
+        self.assertEqual(project_template_dirs(engine), [self.template_dir])
+
+    def test_warm_templates_fills_cache(self):
+        self.assertEqual(warm_templates(), (2, []))
+        loader, = engines['django'].engine.template_loaders
+        self.assertEqual(
+            set(loader.get_template_cache),
+            {'base.html', 'posts/page.html'}
+        )
+        # Файл изменился, но процесс продолжает отдавать разобранный шаблон
+        self.write('base.html', '<div>{% block main %}{% endblock %}</div>')
+        self.assertEqual(
+            engines['django'].get_template('posts/page.html').render(
+                {'text': 'x'}
+            ),
+            '<main>x</main>'
+        )
+
+    def test_command_reports_broken_templates(self):
+        self.write('broken.html', '{% if %}')
+        out, err = StringIO(), StringIO()
+        with self.assertRaises(CommandError):
+            call_command('precompile_templates', stdout=out, stderr=err)
+        self.assertIn('Разобрано шаблонов: 2', out.getvalue())
+        self.assertIn('broken.html', err.getvalue())
+
+    def test_command_benchmark(self):
+        out = StringIO()
+        call_command(
+            'precompile_templates', benchmark=True, repeat=2, stdout=out
+        )
+        self.assertIn('холодный кэш', out.getvalue())
+        self.assertNotIn('выключен', out.getvalue())
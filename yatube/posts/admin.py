@@ -1,10 +1,56 @@
+from django import forms
 from django.contrib import admin
 
-from .models import Post, Group
+from . import timeline
+from .models import Follow, Post, Group
 
 admin.site.register(Group)
 
 
+class FollowForm(forms.ModelForm):
+    class Meta:
+        model = Follow
+        fields = ('user', 'author')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        user = cleaned_data.get('user')
+        author = cleaned_data.get('author')
+        if user and user == author:
+            raise forms.ValidationError('Нельзя подписаться на себя')
+        if Follow.objects.filter(user=user, author=author).exists():
+            raise forms.ValidationError('Такая подписка уже есть')
+        return cleaned_data
+
+
+class FollowAdmin(admin.ModelAdmin):
+    """Подписки создаются и удаляются через posts.timeline: иначе
+    расходятся счётчик подписчиков, ленты подписок и кэш профиля.
+    Изменить подписку нельзя - только удалить и создать новую."""
+    form = FollowForm
+    list_display = ('pk', 'user', 'author')
+    search_fields = ('user__username', 'author__username')
+
+    def get_readonly_fields(self, request, obj=None):
+        return ('user', 'author') if obj else ()
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            return
+        timeline.follow(obj.user, obj.author)
+        obj.pk = Follow.objects.get(user=obj.user, author=obj.author).pk
+
+    def delete_model(self, request, obj):
+        timeline.unfollow(obj.user, obj.author)
+
+    def delete_queryset(self, request, queryset):
+        for follow in queryset.select_related('user', 'author'):
+            timeline.unfollow(follow.user, follow.author)
+
+
+admin.site.register(Follow, FollowAdmin)
+
+
 class PostAdmin(admin.ModelAdmin):
     list_display = (
         'pk',
@@ -18,5 +64,11 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по полнотекстовому индексу вместо LIKE '%term%'."""
+        if not search_term.strip():
+            return queryset, False
+        return queryset.matching(search_term), False
+
 
 admin.site.register(Post, PostAdmin)
@@ -0,0 +1,135 @@
+"""JSON API лент только для чтения.
+
+Строки выбираются через values_list() - без создания объектов моделей -
+и отдаются потоком по одной. Клиент может запросить только нужные поля
+через ?fields=id,text: в SQL попадут только их колонки.
+"""
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from .models import Group, Post, User
+from .paginators import CursorPaginator, encode_cursor, NEXT, PREVIOUS
+
+# Поле API -> путь к колонке в ORM
+API_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'text_html': 'text_html',
+    'excerpt': 'excerpt',
+    'pub_date': 'pub_date',
+    'updated': 'updated',
+    'author': 'author__username',
+    'group': 'group__slug',
+}
+DEFAULT_FIELDS = ('id', 'text', 'pub_date', 'author', 'group')
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def requested_fields(request):
+    fields = request.GET.get('fields')
+    if not fields:
+        return DEFAULT_FIELDS
+    fields = tuple(dict.fromkeys(
+        field.strip() for field in fields.split(',') if field.strip()
+    ))
+    unknown = [field for field in fields if field not in API_FIELDS]
+    if unknown or not fields:
+        raise FieldsError(
+            f'Неизвестные поля: {", ".join(unknown)}. '
+            f'Доступны: {", ".join(API_FIELDS)}'
+        )
+    return fields
+
+
+def error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def dumps(value):
+    return json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def stream_page(request, queryset):
+    """Страница ленты по курсору: {"results": [...], "next": ...,
+    "previous": ...}. Ключ курсора (pub_date, pk) выбирается всегда,
+    но в ответ попадают только запрошенные поля."""
+    try:
+        fields = requested_fields(request)
+    except FieldsError as exc:
+        return error(str(exc), 400)
+    columns = [API_FIELDS[field] for field in fields] + ['pub_date', 'pk']
+    rows, has_next, has_previous = CursorPaginator(
+        queryset, settings.MAX_POSTS
+    ).fetch(
+        request.GET.get('cursor'),
+        lambda rows: rows.values_list(*columns)
+    )
+
+    # Курсоры считаются до начала ответа: после заголовков 200 ошибку
+    # уже не передать
+    next_cursor = previous_cursor = None
+    if rows and has_next:
+        next_cursor = encode_cursor(NEXT, *rows[-1][-2:])
+    if rows and has_previous:
+        previous_cursor = encode_cursor(PREVIOUS, *rows[0][-2:])
+
+    def chunks():
+        yield '{"results": ['
+        for number, row in enumerate(rows):
+            yield (',' if number else '') + dumps(dict(zip(fields, row)))
+        yield '], "next": {}, "previous": {}}}'.format(
+            dumps(next_cursor), dumps(previous_cursor)
+        )
+    return StreamingHttpResponse(chunks(), content_type='application/json')
+
+
+@require_GET
+def post_list(request):
+    return stream_page(request, Post.objects.feed())
+
+
+@require_GET
+def group_posts(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is None:
+        return error('Группа не найдена', 404)
+    return stream_page(
+        request, Post.objects.feed().filter(group_id=group_id)
+    )
+
+
+@require_GET
+def profile_posts(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        return error('Пользователь не найден', 404)
+    return stream_page(
+        request, Post.objects.feed().filter(author_id=author_id)
+    )
+
+
+@require_GET
+def post_detail(request, post_id):
+    try:
+        fields = requested_fields(request)
+    except FieldsError as exc:
+        return error(str(exc), 400)
+    post = Post.objects.filter(pk=post_id).values_list(
+        *(API_FIELDS[field] for field in fields)
+    ).first()
+    if post is None:
+        return error('Пост не найден', 404)
+    return JsonResponse(
+        dict(zip(fields, post)), json_dumps_params={'ensure_ascii': False}
+    )
@@ -0,0 +1,306 @@
+"""Замеры горячих страниц на наполненной базе.
+
+Каждая страница запрашивается тестовым клиентом: сначала для прогрева,
+затем repeat раз для перцентилей времени ответа, ещё раз под
+CaptureQueriesContext для числа запросов к базе и ещё раз под
+tracemalloc для пика выделенной памяти. Результаты можно сохранить
+в JSON и сравнить с прошлым прогоном по порогам BENCHMARK_THRESHOLDS.
+
+load_test() отдельно замеряет пропускную способность ASGI-приложения
+при медленной базе: одновременные запросы идут через WsgiToAsgi с одним
+потоком и с несколькими.
+
+Замеры пишут в базу по умолчанию, поэтому запускаются только с DEBUG
+или с BENCHMARK_DISPOSABLE_DATABASE. run() наполняет базу и замеряет
+страницы в одной транзакции и откатывает её. Оба замера работают со
+своим кэшем BENCHMARK_CACHES, и очистка перед холодными запросами не
+трогает общий кэш сайта.
+"""
+import asyncio
+import math
+import platform
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.asgi import WsgiToAsgi
+
+from .models import AuthorStats, Group, Post, User
+from .seed import seed
+
+PERCENTILES = (50, 90, 95, 99)
+BENCHMARK_USER = 'benchmark'
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    }
+}
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    rank = math.ceil(percent / 100 * len(ordered))
+    return ordered[max(rank, 1) - 1]
+
+
+def check_database():
+    if not (settings.DEBUG or settings.BENCHMARK_DISPOSABLE_DATABASE):
+        raise BenchmarkError(
+            'Замеры пишут в базу: запускайте их с DEBUG или на отдельной '
+            'базе с BENCHMARK_DISPOSABLE_DATABASE = True'
+        )
+
+
+def prepare_dataset(posts):
+    """Досоздаёт посты до posts штук через seed() с постоянным зерном,
+    чтобы прогоны на одном размере шли на одинаковых данных."""
+    missing = posts - Post.objects.count()
+    if missing > 0:
+        seed(
+            users=max(posts // 100, 10), groups=max(posts // 2000, 5),
+            posts=missing, random_seed=posts
+        )
+
+
+def endpoints():
+    """(имя, клиент, метод, адрес, данные) для замеряемых страниц.
+    Для автора и группы берутся самые большие: их ленты самые тяжёлые."""
+    stats = AuthorStats.objects.select_related('author').order_by(
+        '-post_count'
+    ).first()
+    group = Group.objects.order_by('-post_count').first()
+    post = Post.objects.order_by('-pub_date').first()
+    if stats is None or group is None or post is None:
+        raise BenchmarkError('В базе нет постов: запустите seed_yatube')
+    last_page = max(math.ceil(stats.post_count / settings.MAX_POSTS), 1)
+    profile_url = reverse('posts:profile', args=[stats.author.username])
+
+    user, _ = User.objects.get_or_create(
+        username=BENCHMARK_USER,
+        defaults={'is_staff': True, 'is_superuser': True},
+    )
+    anonymous = Client()
+    author = Client()
+    author.force_login(user)
+    return (
+        ('index', anonymous, 'get', reverse('posts:index'), {}),
+        (
+            'group_posts', anonymous, 'get',
+            reverse('posts:group_list', args=[group.slug]), {}
+        ),
+        ('profile', anonymous, 'get', profile_url, {}),
+        ('profile_deep', anonymous, 'get', profile_url, {'page': last_page}),
+        (
+            'post_detail', anonymous, 'get',
+            reverse('posts:post_detail', args=[post.pk]), {}
+        ),
+        (
+            'post_create', author, 'post', reverse('posts:post_create'),
+            {'text': 'Пост для замера', 'group': group.pk}
+        ),
+        (
+            'admin_changelist', author, 'get',
+            reverse('admin:posts_post_changelist'), {}
+        ),
+    )
+
+
+def request(client, method, url, data, cold):
+    if cold:
+        cache.clear()
+    response = getattr(client, method)(url, data)
+    if response.status_code >= 400:
+        raise BenchmarkError(f'{url}: ответ {response.status_code}')
+    return response
+
+
+def measure(client, method, url, data, repeat, cold):
+    request(client, method, url, data, cold)
+    timings = []
+    for _ in range(repeat):
+        if cold:
+            cache.clear()
+        started = time.perf_counter()
+        request(client, method, url, data, cold=False)
+        timings.append((time.perf_counter() - started) * 1000)
+    with CaptureQueriesContext(connection) as queries:
+        request(client, method, url, data, cold)
+    # Следующий запрос очистит журнал запросов соединения
+    query_count = len(queries)
+    if cold:
+        cache.clear()
+    tracemalloc.start()
+    try:
+        request(client, method, url, data, cold=False)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    result = {
+        f'p{percent}_ms': round(percentile(timings, percent), 3)
+        for percent in PERCENTILES
+    }
+    result['mean_ms'] = round(sum(timings) / len(timings), 3)
+    result['queries'] = query_count
+    result['memory_kb'] = round(peak / 1024, 1)
+    return result
+
+
+def run(posts, repeat=50, cold=True, only=None):
+    """Замеряет страницы на базе не меньше чем из posts постов. Всё,
+    что создают наполнение и замеры, откатывается. Возвращает словарь
+    для JSON."""
+    check_database()
+    results = {}
+    allowed_hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+    with override_settings(
+        DEBUG=False, ALLOWED_HOSTS=allowed_hosts, CACHES=BENCHMARK_CACHES
+    ), transaction.atomic():
+        prepare_dataset(posts)
+        meta = {
+            'posts': Post.objects.count(),
+            'users': User.objects.count(),
+            'groups': Group.objects.count(),
+        }
+        for name, client, method, url, data in endpoints():
+            if only and name not in only:
+                continue
+            results[name] = measure(client, method, url, data, repeat, cold)
+        transaction.set_rollback(True)
+    meta.update({
+        'created': timezone.now().isoformat(),
+        'repeat': repeat,
+        'cache': 'cold' if cold else 'warm',
+        'pagination': settings.FEED_PAGINATION,
+        'database': connection.vendor,
+        'django': django.get_version(),
+        'python': platform.python_version(),
+    })
+    return {'meta': meta, 'endpoints': results}
+
+
+def compare(results, baseline, thresholds):
+    """Регрессии относительно baseline: метрики, выросшие больше чем
+    в 1 + порог раз. Страницы, которых нет в обоих прогонах,
+    не сравниваются."""
+    regressions = []
+    for name, metrics in results['endpoints'].items():
+        previous = baseline['endpoints'].get(name)
+        if previous is None:
+            continue
+        for metric, threshold in thresholds.items():
+            if metric not in metrics or metric not in previous:
+                continue
+            limit = previous[metric] * (1 + threshold)
+            if metrics[metric] > limit:
+                regressions.append(
+                    f'{name}.{metric}: {metrics[metric]} > {limit:g} '
+                    f'(было {previous[metric]}, порог +{threshold:.0%})'
+                )
+    return regressions
+
+
+def slowed(application, delay):
+    """WSGI-приложение, в котором каждый SQL-запрос ждёт ещё delay
+    секунд: так локально изображается медленная или далёкая база."""
+    def slow_execute(execute, sql, params, many, context):
+        time.sleep(delay)
+        return execute(sql, params, many, context)
+
+    def wrapper(environ, start_response):
+        # Обёртка ставится на соединение потока, который ведёт запрос;
+        # тело собирается здесь же, пока она действует
+        with connection.execute_wrapper(slow_execute):
+            response = application(environ, start_response)
+            try:
+                return list(response)
+            finally:
+                if hasattr(response, 'close'):
+                    response.close()
+    return wrapper
+
+
+async def drive(application, path, requests, concurrency):
+    """Отправляет requests GET-запросов к path, не больше concurrency
+    одновременно. Возвращает общее время и время каждого ответа."""
+    scope = {
+        'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'',
+        'headers': [(b'host', b'testserver')],
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 0),
+    }
+    timings = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def client(count):
+        for _ in range(count):
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            started = time.perf_counter()
+            await application(scope, receive, send)
+            timings.append((time.perf_counter() - started) * 1000)
+            if messages[0]['status'] >= 400:
+                raise BenchmarkError(f'{path}: ответ {messages[0]["status"]}')
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        client(requests // concurrency + (number < requests % concurrency))
+        for number in range(concurrency)
+    ))
+    return time.perf_counter() - started, timings
+
+
+def load_test(path, requests=200, concurrency=16, threads=(1, 16),
+              query_delay=0.01, cold=True):
+    """Пропускная способность ASGI-приложения для каждого числа потоков
+    из threads при задержке query_delay секунд на SQL-запрос. С cold
+    кэш страниц лент выключен, и каждый запрос идёт в базу.
+
+    Запросы идут из потоков пула через их собственные соединения и не
+    видят незафиксированных данных, поэтому база наполняется заранее -
+    prepare_dataset() вне транзакции."""
+    check_database()
+    application = slowed(get_wsgi_application(), query_delay)
+    results = {}
+    overrides = {
+        'DEBUG': False,
+        'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'],
+        'CACHES': BENCHMARK_CACHES,
+    }
+    if cold:
+        overrides['FEED_CACHE_TIMEOUT'] = 0
+    with override_settings(**overrides):
+        for count in threads:
+            if cold:
+                cache.clear()
+            asgi = WsgiToAsgi(application, count)
+            try:
+                elapsed, timings = asyncio.run(
+                    drive(asgi, path, requests, concurrency)
+                )
+            finally:
+                asgi.executor.shutdown()
+            results[count] = {
+                'requests_per_second': round(requests / elapsed, 1),
+                'p50_ms': round(percentile(timings, 50), 3),
+                'p95_ms': round(percentile(timings, 95), 3),
+            }
+    return results
@@ -0,0 +1,153 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+from core.routers import replica_may_lag
+
+from .models import Group, User
+
+FEED_VERSION_KEY = 'feed-version:{}'
+FEED_PAGE_KEY = 'feed-page:{}:{}:{}'
+FEED_COUNT_KEY = 'feed-count:{}:{}'
+# Параметры запроса, от которых зависит содержимое страницы ленты
+FEED_PAGE_PARAMS = ('page', 'cursor', 'per_page')
+
+
+def index_feed():
+    return 'index'
+
+
+def group_feed(slug):
+    return f'group:{slug}'
+
+
+def profile_feed(username):
+    return f'profile:{username}'
+
+
+def timeline_feed(user_id):
+    return f'timeline:{user_id}'
+
+
+def feed_digest(feed):
+    # Слаги и имена пользователей могут содержать символы, недопустимые
+    # в ключах memcached
+    return hashlib.md5(feed.encode()).hexdigest()
+
+
+def feed_version_key(feed):
+    return FEED_VERSION_KEY.format(feed_digest(feed))
+
+
+def feed_version(feed):
+    """Версия ленты - момент её последнего изменения. Ключи страниц
+    включают версию, поэтому смена версии сбрасывает все страницы ленты.
+    Версия хранится FEED_VERSION_TIMEOUT секунд: после этого создаётся
+    новая, и страницы ленты просто отрисовываются заново."""
+    key = feed_version_key(feed)
+    version = cache.get(key)
+    if version is None:
+        version = time.time()
+        if not cache.add(key, version, settings.FEED_VERSION_TIMEOUT):
+            version = cache.get(key, version)
+    return version
+
+
+def feed_count(feed, post_list):
+    """Число постов ленты: COUNT(*) выполняется один раз на версию ленты,
+    дальше число берётся из кэша."""
+    if not settings.FEED_CACHE_TIMEOUT:
+        return post_list.count()
+    version = feed_version(feed)
+    key = FEED_COUNT_KEY.format(feed_digest(feed), version)
+    count = cache.get(key)
+    if count is None:
+        count = post_list.count()
+        if not replica_may_lag(version):
+            cache.set(key, count, settings.FEED_CACHE_TIMEOUT)
+    return count
+
+
+def _bump_versions(feeds):
+    now = time.time()
+    cache.set_many(
+        {feed_version_key(feed): now for feed in feeds},
+        settings.FEED_VERSION_TIMEOUT
+    )
+
+
+def invalidate_feeds(*feeds):
+    """Сбрасывает страницы лент сразу и ещё раз после коммита: иначе
+    параллельный запрос успел бы закэшировать данные до коммита."""
+    feeds = set(feeds)
+    _bump_versions(feeds)
+    transaction.on_commit(lambda: _bump_versions(feeds))
+
+
+def invalidate_post_feeds(author_ids, group_ids):
+    """Сбрасывает кэш только тех лент, где пост был или появился:
+    общей, профилей авторов и групп."""
+    invalidate_feeds(
+        index_feed(),
+        *(profile_feed(username) for username in User.objects.filter(
+            pk__in=author_ids
+        ).values_list('username', flat=True)),
+        *(group_feed(slug) for slug in Group.objects.filter(
+            pk__in=[pk for pk in group_ids if pk is not None]
+        ).values_list('slug', flat=True)),
+    )
+
+
+def feed_page_key(request, feed, version):
+    params = '&'.join(
+        f'{name}={request.GET.get(name)}' for name in FEED_PAGE_PARAMS
+        if name in request.GET
+    )
+    digest = hashlib.md5(f'{feed}?{params}'.encode()).hexdigest()
+    # Шапка страницы зависит от пользователя
+    viewer = request.user.pk or 'anonymous'
+    return FEED_PAGE_KEY.format(digest, version, viewer)
+
+
+def cache_stream(key, chunks):
+    """Передаёт части потокового ответа дальше и кэширует страницу,
+    когда клиент дочитал её до конца."""
+    content = []
+    for chunk in chunks:
+        content.append(chunk)
+        yield chunk
+    cache.set(key, b''.join(content), settings.FEED_CACHE_TIMEOUT)
+
+
+def cache_feed(feed):
+    """Кэширует отрисованные страницы ленты; feed получает аргументы
+    представления из URL и возвращает имя ленты."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or not settings.FEED_CACHE_TIMEOUT:
+                return view(request, *args, **kwargs)
+            version = feed_version(feed(*args, **kwargs))
+            key = feed_page_key(request, feed(*args, **kwargs), version)
+            content = cache.get(key)
+            if content is not None:
+                return HttpResponse(content)
+            response = view(request, *args, **kwargs)
+            # Страница с отстающей реплики закэшировалась бы под новой
+            # версией ленты, но без последнего изменения
+            if response.status_code != 200 or replica_may_lag(version):
+                return response
+            if response.streaming:
+                response.streaming_content = cache_stream(
+                    key, response.streaming_content
+                )
+            else:
+                cache.set(key, response.content, settings.FEED_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
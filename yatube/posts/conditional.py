@@ -0,0 +1,81 @@
+"""Условные GET-запросы (ETag / Last-Modified) для лент и страниц постов.
+
+Валидаторы считаются без запроса страницы: для лент - по версии ленты
+из кэша, которую меняет каждая запись в ленту, для поста - по одной
+выборке из индекса первичного ключа.
+"""
+import hashlib
+from datetime import datetime
+from functools import wraps
+
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from core.routers import replica_may_lag
+
+from .cache import feed_page_key, feed_version
+from .models import Post
+
+
+def make_etag(*parts):
+    return hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+
+
+def conditional_feed(feed):
+    """Отвечает 304 на повторный запрос страницы ленты, которая не
+    менялась. Ответы помечаются no-cache: браузер и прокси хранят их,
+    но каждый раз сверяют валидаторы. Страница с отстающей реплики
+    уходит без валидаторов, чтобы браузер не закрепил её под новой
+    версией ленты."""
+    def etag(request, *args, **kwargs):
+        version = feed_version(feed(*args, **kwargs))
+        if replica_may_lag(version):
+            return None
+        return make_etag(
+            feed_page_key(request, feed(*args, **kwargs), version)
+        )
+
+    def last_modified(request, *args, **kwargs):
+        version = feed_version(feed(*args, **kwargs))
+        if replica_may_lag(version):
+            return None
+        return datetime.fromtimestamp(version, timezone.utc)
+
+    def decorator(view):
+        return wraps(view)(cache_control(no_cache=True)(
+            condition(etag_func=etag, last_modified_func=last_modified)(view)
+        ))
+    return decorator
+
+
+def post_state(request, post_id):
+    """Время изменения поста и число постов его автора - всё, что может
+    поменять страницу поста. Запоминается на время запроса."""
+    if not hasattr(request, '_post_state'):
+        request._post_state = Post.objects.filter(pk=post_id).values_list(
+            'updated', 'author__stats__post_count'
+        ).first()
+    return request._post_state
+
+
+def post_etag(request, post_id):
+    state = post_state(request, post_id)
+    if state is None:
+        return None
+    updated, post_count = state
+    return make_etag(post_id, updated.isoformat(), post_count,
+                     request.user.pk)
+
+
+def post_last_modified(request, post_id):
+    state = post_state(request, post_id)
+    return state and state[0]
+
+
+def conditional_post(view):
+    return wraps(view)(cache_control(no_cache=True)(
+        condition(etag_func=post_etag, last_modified_func=post_last_modified)(
+            view
+        )
+    ))
@@ -0,0 +1,101 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import AuthorStats, Follow, Group, Post, User
+
+
+def change_group_count(group_id, delta):
+    if group_id is None:
+        return
+    groups = Group.objects.filter(pk=group_id)
+    if delta < 0:
+        groups = groups.filter(post_count__gte=-delta)
+    groups.update(post_count=F('post_count') + delta)
+
+
+def _change_stats(author_id, field, delta):
+    stats = AuthorStats.objects.filter(author_id=author_id)
+    if delta < 0:
+        stats = stats.filter(**{f'{field}__gte': -delta})
+    if stats.update(**{field: F(field) + delta}) or delta < 0:
+        return
+    # Первое изменение для автора: строка счётчиков создаётся
+    # с точными значениями
+    try:
+        with transaction.atomic():
+            AuthorStats.objects.create(
+                author_id=author_id,
+                post_count=Post.objects.filter(author_id=author_id).count(),
+                follower_count=Follow.objects.filter(
+                    author_id=author_id
+                ).count(),
+            )
+    except IntegrityError:
+        AuthorStats.objects.filter(author_id=author_id).update(
+            **{field: F(field) + delta}
+        )
+
+
+def change_author_count(author_id, delta):
+    _change_stats(author_id, 'post_count', delta)
+
+
+def change_follower_count(author_id, delta):
+    _change_stats(author_id, 'follower_count', delta)
+
+
+def recount():
+    """Пересчитывает счётчики постов групп, постов и подписчиков авторов
+    по таблицам постов и подписок. Возвращает число исправленных групп
+    и авторов."""
+    with transaction.atomic():
+        groups = list(
+            Group.objects.annotate(actual=Count('posts'))
+            .exclude(post_count=F('actual'))
+        )
+        for group in groups:
+            group.post_count = group.actual
+        Group.objects.bulk_update(groups, ('post_count',), batch_size=500)
+
+        followers = dict(
+            User.objects.annotate(actual=Count('following'))
+            .values_list('pk', 'actual')
+            .iterator()
+        )
+        counted = {
+            author_id: (post_count, followers[author_id])
+            for author_id, post_count
+            in User.objects.annotate(actual=Count('posts'))
+            .values_list('pk', 'actual')
+            .iterator()
+        }
+        stats = {
+            author_id: (post_count, follower_count)
+            for author_id, post_count, follower_count
+            in AuthorStats.objects.values_list(
+                'author_id', 'post_count', 'follower_count'
+            ).iterator()
+        }
+        drifted = [
+            AuthorStats(
+                author_id=author_id,
+                post_count=actual[0],
+                follower_count=actual[1]
+            )
+            for author_id, actual in counted.items()
+            if author_id in stats and stats[author_id] != actual
+        ]
+        missing = [
+            AuthorStats(
+                author_id=author_id,
+                post_count=actual[0],
+                follower_count=actual[1]
+            )
+            for author_id, actual in counted.items()
+            if author_id not in stats
+        ]
+        AuthorStats.objects.bulk_update(
+            drifted, ('post_count', 'follower_count'), batch_size=500
+        )
+        AuthorStats.objects.bulk_create(missing, batch_size=500)
+    return len(groups), len(drifted) + len(missing)
@@ -17,3 +17,13 @@ class PostForm(ModelForm):
                     'Поле обязательно для заполнения',
             'group': 'Группа поста',
         }
+
+
+class PostImageForm(ModelForm):
+    """Картинка поста. Отдельная форма работает с тем же объектом,
+    что и PostForm: передайте ей instance=form.instance."""
+
+    class Meta:
+        model = Post
+        fields = ('image',)
+        labels = {'image': 'Картинка'}
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from posts.benchmark import (
+    BenchmarkError, check_database, load_test, prepare_dataset
+)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность yatube.asgi с одним и '
+            'несколькими потоками при искусственно медленной базе')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000,
+                            help='Досоздать посты до этого числа')
+        parser.add_argument('--path',
+                            help='Адрес нагружаемой страницы, по умолчанию '
+                                 'главная')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Всего запросов на каждый прогон')
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help='Одновременных запросов')
+        parser.add_argument('--threads', type=int, nargs='+',
+                            default=[1, 16],
+                            help='Размеры пула потоков для сравнения')
+        parser.add_argument('--query-delay', type=float, default=10,
+                            help='Задержка каждого SQL-запроса, мс')
+        parser.add_argument('--warm-cache', action='store_true',
+                            help='Не выключать кэш страниц лент')
+
+    def handle(self, *args, **options):
+        try:
+            check_database()
+            prepare_dataset(options['posts'])
+            results = load_test(
+                options['path'] or reverse('posts:index'),
+                options['requests'],
+                options['concurrency'], options['threads'],
+                options['query_delay'] / 1000,
+                cold=not options['warm_cache'],
+            )
+        except BenchmarkError as error:
+            raise CommandError(error)
+        for threads, metrics in results.items():
+            self.stdout.write(
+                f'потоков {threads:>3}  '
+                f'{metrics["requests_per_second"]:>8.1f} запросов/с  '
+                f'p50 {metrics["p50_ms"]:>8.2f} мс  '
+                f'p95 {metrics["p95_ms"]:>8.2f} мс'
+            )
@@ -0,0 +1,54 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.benchmark import BenchmarkError, compare, run
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время ответа, число запросов и память горячих '
+            'страниц; с --baseline падает на регрессиях')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10000,
+                            help='Досоздать посты до этого числа')
+        parser.add_argument('--repeat', type=int, default=50,
+                            help='Число замеров каждой страницы')
+        parser.add_argument('--warm-cache', action='store_true',
+                            help='Не очищать кэш перед запросами')
+        parser.add_argument('--only', nargs='+', metavar='NAME',
+                            help='Замерить только эти страницы')
+        parser.add_argument('--output', help='Сохранить результаты в JSON')
+        parser.add_argument('--baseline',
+                            help='JSON прошлого прогона для сравнения')
+
+    def handle(self, *args, **options):
+        try:
+            results = run(
+                options['posts'], options['repeat'],
+                cold=not options['warm_cache'], only=options['only'],
+            )
+        except BenchmarkError as error:
+            raise CommandError(error)
+        for name, metrics in results['endpoints'].items():
+            self.stdout.write(
+                f'{name:<18} p50 {metrics["p50_ms"]:>8.2f} мс  '
+                f'p95 {metrics["p95_ms"]:>8.2f} мс  '
+                f'запросов {metrics["queries"]:>3}  '
+                f'память {metrics["memory_kb"]:>8.1f} КБ'
+            )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                regressions = compare(
+                    results, json.load(baseline),
+                    settings.BENCHMARK_THRESHOLDS
+                )
+            if regressions:
+                raise CommandError(
+                    'Регрессии производительности:\n' + '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
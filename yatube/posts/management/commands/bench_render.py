@@ -0,0 +1,70 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.utils import timezone
+
+from posts.models import AuthorStats, Group, Post, User
+
+FEED_TEMPLATES = (
+    'posts/index.html',
+    'posts/group_list.html',
+    'posts/profile.html',
+)
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время отрисовки страниц лент без кэша фрагментов '
+            '(холодный кэш) и с заполненным кэшем карточек и шапки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10,
+                            help='Постов на странице')
+        parser.add_argument('--repeat', type=int, default=200,
+                            help='Число отрисовок каждой страницы')
+
+    def handle(self, *args, **options):
+        author = User(pk=1, username='bench', first_name='Лев',
+                      last_name='Толстой')
+        author.stats = AuthorStats(author=author, post_count=options['posts'])
+        group = Group(pk=1, title='Бенчмарк', slug='bench',
+                      description='Группа для замеров')
+        now = timezone.now()
+        posts = [
+            Post(pk=pk, text='Строка текста поста.\n' * 20, author=author,
+                 group=group, pub_date=now, updated=now)
+            for pk in range(1, options['posts'] + 1)
+        ]
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        context = {
+            'page_obj': Paginator(posts, options['posts']).get_page(1),
+            'author': author,
+            'group': group,
+        }
+        for template in FEED_TEMPLATES:
+            cold = self.measure(template, context, request,
+                                options['repeat'], clear=True)
+            warm = self.measure(template, context, request,
+                                options['repeat'], clear=False)
+            self.stdout.write(
+                f'{template}: холодный кэш {cold:.3f} мс, '
+                f'тёплый кэш {warm:.3f} мс, ускорение {cold / warm:.1f}x'
+            )
+
+    @staticmethod
+    def measure(template, context, request, repeat, clear):
+        """Среднее время отрисовки страницы в миллисекундах."""
+        render_to_string(template, context, request)
+        total = 0
+        for _ in range(repeat):
+            if clear:
+                cache.clear()
+            started = time.perf_counter()
+            render_to_string(template, context, request)
+            total += time.perf_counter() - started
+        return total / repeat * 1000
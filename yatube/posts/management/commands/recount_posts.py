@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает и исправляет счётчики авторов и групп'
+
+    def handle(self, *args, **options):
+        groups, authors = recount()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: групп - {groups}, авторов - {authors}'
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Готовит HTML и начало текста для постов, где их нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Пересчитать все посты, а не только пустые')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        posts = Post.objects.all()
+        if not options['all']:
+            posts = posts.filter(text_html='')
+        rendered = posts.render_texts(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано постов: {rendered}'
+        ))
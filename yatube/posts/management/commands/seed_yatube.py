@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.seed import seed
+
+
+class Command(BaseCommand):
+    help = ('Наполняет базу пользователями, группами и постами '
+            'для нагрузочных замеров')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней разбросать даты постов')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Число процессов, готовящих посты; '
+                                 'в SQLite они всё равно пишут по очереди')
+        parser.add_argument('--prefix', default='seed',
+                            help='Начало имён пользователей и слагов групп')
+        parser.add_argument('--locale', default='ru_RU')
+        parser.add_argument('--seed', type=int,
+                            help='Зерно генератора для повторяемых данных')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        created = seed(
+            options['users'], options['groups'], options['posts'],
+            days=options['days'], batch_size=options['batch_size'],
+            workers=options['workers'], prefix=options['prefix'],
+            locale=options['locale'], random_seed=options['seed'],
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано постов: {created} за {elapsed:.1f} с '
+            f'({created / elapsed:.0f} в секунду)'
+        ))
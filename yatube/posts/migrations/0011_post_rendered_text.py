@@ -0,0 +1,58 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:56
+
+from django.db import migrations, models
+from django.template.defaultfilters import linebreaksbr
+from django.utils.text import Truncator
+
+# Копии posts.models.render_text_html и make_excerpt на момент миграции:
+# их последующие изменения не должны менять историю
+EXCERPT_LENGTH = 30
+BATCH_SIZE = 500
+
+
+def render_text_html(text):
+    return linebreaksbr(text)
+
+
+def make_excerpt(text):
+    return Truncator(text).chars(EXCERPT_LENGTH)
+
+
+def fill_rendered_text(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    last_pk = 0
+    while True:
+        # Пачки по первичному ключу: в памяти не больше BATCH_SIZE постов,
+        # и запись не идёт поверх открытого курсора чтения
+        posts = list(
+            Post.objects.filter(pk__gt=last_pk).order_by('pk')
+            .only('pk', 'text')[:BATCH_SIZE]
+        )
+        if not posts:
+            return
+        for post in posts:
+            post.text_html = render_text_html(post.text)
+            post.excerpt = make_excerpt(post.text)
+        Post.objects.bulk_update(posts, ('text_html', 'excerpt'))
+        last_pk = posts[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(default='', editable=False, help_text='Готовится из текста при сохранении поста', max_length=30, verbose_name='Начало текста'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(default='', editable=False, help_text='Готовится из текста при сохранении поста', verbose_name='Текст в HTML'),
+        ),
+        migrations.RunPython(fill_rendered_text, migrations.RunPython.noop),
+    ]
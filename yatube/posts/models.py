@@ -1,8 +1,33 @@
+import hashlib
+import os
+
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models.expressions import RawSQL
+from django.template.defaultfilters import linebreaksbr
+from django.utils.text import Truncator
+
+from . import search
 
 User = get_user_model()
 STRING_FROM_POST = 'author: {}, date: {:%m%d%Y}, group: {}, text: {:.15}'
+EXCERPT_LENGTH = 30
+# Колонки, которые нужны шаблонам лент для карточки поста
+FEED_FIELDS = (
+    'id',
+    'text_html',
+    'pub_date',
+    'updated',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group__slug',
+    'group__title',
+    'image',
+    'image_width',
+    'image_height',
+    'image_srcset',
+)
 
 
 class Group(models.Model):
@@ -20,6 +45,12 @@ class Group(models.Model):
         verbose_name='Описание',
         help_text='Опишите группу как можно подробнее'
     )
+    post_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число постов',
+        help_text='Обновляется автоматически при публикации постов'
+    )
 
     class Meta:
         verbose_name = 'Группа'
@@ -29,15 +60,138 @@ class Group(models.Model):
         return self.title
 
 
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Автор'
+    )
+    post_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число постов',
+        help_text='Обновляется автоматически при публикации постов'
+    )
+    follower_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число подписчиков',
+        help_text='Обновляется автоматически при подписке и отписке'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'{self.author}: {self.post_count}'
+
+
+def render_text_html(text):
+    """Экранированный HTML текста поста с переносами строк."""
+    return linebreaksbr(text)
+
+
+def make_excerpt(text):
+    return Truncator(text).chars(EXCERPT_LENGTH)
+
+
+def post_image_path(instance, filename):
+    """posts/ab/<sha256>.jpg: имя по содержимому, поэтому у новой
+    картинки всегда новый URL и браузер может кэшировать её навсегда."""
+    digest = hashlib.sha256()
+    for chunk in instance.image.chunks():
+        digest.update(chunk)
+    name = digest.hexdigest()
+    extension = os.path.splitext(filename)[1].lower()
+    return f'posts/{name[:2]}/{name}{extension}'
+
+
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Посты для лент: автор и группа одним запросом через JOIN,
+        из таблиц выбираются только колонки, нужные карточке поста."""
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+    def detail(self):
+        """Пост для отдельной страницы вместе со счётчиком постов автора."""
+        return self.select_related('author__stats', 'group').only(
+            *FEED_FIELDS, 'excerpt', 'author__stats__post_count'
+        )
+
+    def matching(self, query):
+        """Посты со всеми словами запроса - по полнотекстовому индексу."""
+        return self.filter(pk__in=RawSQL(
+            search.MATCHING_IDS, [search.match_expression(query)]
+        ))
+
+    def search(self, query):
+        """Найденные посты по убыванию релевантности; в snippet -
+        фрагмент текста с отмеченными совпадениями."""
+        table = search.SEARCH_TABLE
+        return self.extra(
+            select={'snippet': search.SNIPPET},
+            tables=[table],
+            where=[
+                f'{table}.rowid = {self.model._meta.db_table}.id',
+                f'{table} MATCH %s',
+            ],
+            params=[search.match_expression(query)],
+            order_by=[f'{table}.rank'],
+        )
+
+    def render_texts(self, batch_size=1000):
+        """Заново готовит HTML и начало текста постов пачками по
+        batch_size. Возвращает число обработанных постов."""
+        rendered = last_pk = 0
+        while True:
+            batch = list(
+                self.filter(pk__gt=last_pk).order_by('pk')
+                .only('pk', 'text')[:batch_size]
+            )
+            if not batch:
+                return rendered
+            for post in batch:
+                post.render_text()
+            self.model.objects.bulk_update(batch, ('text_html', 'excerpt'))
+            rendered += len(batch)
+            last_pk = batch[-1].pk
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """bulk_create не вызывает save(): HTML текста готовится здесь."""
+        objs = list(objs)
+        for obj in objs:
+            obj.render_text()
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст',
         help_text='Основной текст поста')
+    text_html = models.TextField(
+        default='',
+        editable=False,
+        verbose_name='Текст в HTML',
+        help_text='Готовится из текста при сохранении поста'
+    )
+    excerpt = models.CharField(
+        max_length=EXCERPT_LENGTH,
+        default='',
+        editable=False,
+        verbose_name='Начало текста',
+        help_text='Готовится из текста при сохранении поста'
+    )
     pub_date = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата публикации',
         help_text='Заполняется автоматически, в момент создания поста'
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+        help_text='Заполняется автоматически при каждом сохранении поста'
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -52,9 +206,51 @@ class Post(models.Model):
         related_name='posts',
         verbose_name='Группа'
     )
+    image = models.ImageField(
+        upload_to=post_image_path,
+        blank=True,
+        width_field='image_width',
+        height_field='image_height',
+        verbose_name='Картинка',
+        help_text='Необязательная картинка к посту'
+    )
+    image_width = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Ширина картинки'
+    )
+    image_height = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Высота картинки'
+    )
+    image_srcset = models.TextField(
+        default='',
+        editable=False,
+        verbose_name='Уменьшенные копии картинки',
+        help_text='Готовятся обработчиком задач после загрузки картинки'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
+        # Индексы под порядок лент: общей, группы и автора
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'), name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_pub_date_idx'
+            ),
+        )
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -65,3 +261,105 @@ class Post(models.Model):
             self.group,
             self.text,
         )
+
+    def render_text(self):
+        self.text_html = render_text_html(self.text)
+        self.excerpt = make_excerpt(self.text)
+
+    def save(self, *args, **kwargs):
+        self.render_text()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {
+                *update_fields, 'text_html', 'excerpt'
+            }
+        super().save(*args, **kwargs)
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower',
+        verbose_name='Подписчик'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+        verbose_name='Автор'
+    )
+    pulled_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Посты забраны',
+        help_text='Момент, до которого посты популярного автора уже '
+                  'добавлены в ленту подписчика'
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow'
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='no_self_follow'
+            ),
+        )
+        verbose_name = 'Подписка'
+        verbose_name_plural = 'Подписки'
+
+    def __str__(self):
+        return f'{self.user} -> {self.author}'
+
+
+class TimelineEntryQuerySet(models.QuerySet):
+    def feed(self):
+        """Записи ленты вместе с постами: только колонки карточки."""
+        return self.select_related('post__author', 'post__group').only(
+            'pub_date', 'post', *(f'post__{field}' for field in FEED_FIELDS)
+        )
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок пользователя. Записи создаются при
+    публикации поста, и лента читается одним диапазоном по индексу."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+        help_text='Копия даты публикации поста для порядка ленты'
+    )
+
+    objects = TimelineEntryQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('-pub_date', '-id')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_timeline_entry'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-id'),
+                name='timeline_user_pub_date_idx'
+            ),
+        )
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи ленты подписок'
+
+    def __str__(self):
+        return f'{self.user}: {self.post_id}'
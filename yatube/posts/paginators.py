@@ -0,0 +1,186 @@
+import base64
+import binascii
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+# Порядок ленты для курсорной пагинации: pk различает посты
+# с одинаковой датой публикации
+CURSOR_ORDERING = ('-pub_date', '-pk')
+NEXT = 'n'
+PREVIOUS = 'p'
+# Наибольшее смещение страницы ProbePaginator; больше строк в ленте нет
+MAX_OFFSET = 2 ** 31
+# Ключи постов - знаковые 64-битные целые базы; pk курсора вне этих
+# пределов не помещается в параметр запроса
+PK_RANGE = range(-2 ** 63, 2 ** 63)
+
+
+def encode_cursor(direction, pub_date, pk):
+    """Непрозрачный токен позиции в ленте: направление и (pub_date, pk)."""
+    raw = f'{direction}{pub_date.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает (direction, pub_date, pk) или None для битого токена."""
+    try:
+        raw = base64.urlsafe_b64decode(
+            token + '=' * (-len(token) % 4)
+        ).decode()
+        pub_date, pk = raw[1:].split('|')
+        pub_date, pk = parse_datetime(pub_date), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if (
+        raw[0] not in (NEXT, PREVIOUS) or pub_date is None
+        or pk not in PK_RANGE
+    ):
+        return None
+    return raw[0], pub_date, pk
+
+
+class CursorPage(Page):
+    def __init__(self, object_list, has_next, has_previous, paginator):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<Cursor page of {len(self)} objects>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            post = self.object_list[-1]
+            return encode_cursor(NEXT, post.pub_date, post.pk)
+        return ''
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            post = self.object_list[0]
+            return encode_cursor(PREVIOUS, post.pub_date, post.pk)
+        return ''
+
+
+class CursorPaginator:
+    """Пагинация по ключу (pub_date, pk) вместо COUNT(*) и OFFSET:
+    страница выбирается диапазоном по индексу, поэтому глубокие
+    страницы открываются так же быстро, как первая."""
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+
+    def window(self, cursor):
+        """Упорядоченный запрос строк страницы, направление и признак
+        первой страницы. Без курсора или с битым курсором - первая
+        страница, как у Paginator.get_page. Из запроса нужно взять
+        per_page + 1 строк и передать их в split()."""
+        position = decode_cursor(cursor) if cursor else None
+        if position is None:
+            return self.first_window()
+        direction, pub_date, pk = position
+        if direction == NEXT:
+            return self.object_list.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            ).order_by(*CURSOR_ORDERING), NEXT, False
+        return self.object_list.filter(
+            Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+        ).order_by(
+            *(field.lstrip('-') for field in CURSOR_ORDERING)
+        ), PREVIOUS, False
+
+    def first_window(self):
+        return self.object_list.order_by(*CURSOR_ORDERING), NEXT, True
+
+    def split(self, rows, direction, is_first):
+        """Строки страницы в порядке ленты, has_next и has_previous.
+        Лишняя строка показывает, есть ли что-то дальше, без COUNT(*)."""
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == NEXT:
+            return rows, has_more, not is_first
+        rows.reverse()
+        return rows, True, has_more
+
+    def fetch(self, cursor, rows=lambda queryset: queryset):
+        """Строки страницы, has_next и has_previous; rows превращает
+        запрос в нужный вид строк, например values_list()."""
+        queryset, direction, is_first = self.window(cursor)
+        page = list(rows(queryset)[:self.per_page + 1])
+        # За устаревшим курсором (пост удалён или курсор старше всех
+        # постов) строк нет: открывается первая страница
+        if not page and not is_first:
+            queryset, direction, is_first = self.first_window()
+            page = list(rows(queryset)[:self.per_page + 1])
+        return self.split(page, direction, is_first)
+
+    def get_page(self, cursor):
+        return CursorPage(*self.fetch(cursor), paginator=self)
+
+
+class ProbePage(Page):
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+    # Номера соседних страниц известны без числа страниц
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+class ProbePaginator(Paginator):
+    """Нумерованные страницы без COUNT(*) на каждый запрос: страница
+    выбирается с одной лишней строкой, которая показывает, есть ли
+    следующая. Общее число строк нужно только для номеров страниц и
+    берётся у counter() - например, из счётчика постов, - а без него
+    считается COUNT(*) при первом обращении."""
+
+    def __init__(self, object_list, per_page, counter=None):
+        super().__init__(object_list, per_page)
+        self.counter = counter
+
+    @cached_property
+    def count(self):
+        if self.counter is not None:
+            return self.counter()
+        return self.object_list.count()
+
+    def page(self, number):
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        return ProbePage(
+            rows[:self.per_page], number, self,
+            has_next=len(rows) > self.per_page
+        )
+
+    def get_page(self, number):
+        """Как Paginator.get_page: нечисловой номер - первая страница,
+        номер за пределами ленты - последняя."""
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = 1
+        # Огромный номер дал бы смещение, которое не помещается в OFFSET
+        # базы; постов за таким смещением заведомо нет
+        if number >= 1 and (number - 1) * self.per_page <= MAX_OFFSET:
+            page = self.page(number)
+            if page.object_list or number == 1:
+                return page
+        return self.page(self.num_pages)
@@ -0,0 +1,103 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Индекс - external content таблица над posts_post: текст хранится только
+в posts_post, а триггеры обновляют индекс при любом изменении таблицы,
+в том числе через bulk_create и QuerySet.update().
+"""
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+SEARCH_TABLE = 'posts_post_fts'
+# Маркеры совпадений в snippet(): в тексте постов их не бывает,
+# поэтому после экранирования их можно заменить на <mark>
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+SNIPPET_TOKENS = 24
+
+CREATE_TABLE = f'''
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        text,
+        content='posts_post',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+'''
+CREATE_TRIGGERS = (
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert
+    AFTER INSERT ON posts_post BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete
+    AFTER DELETE ON posts_post BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update
+    AFTER UPDATE OF text ON posts_post BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {SEARCH_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    ''',
+)
+REBUILD = f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')"
+DROP = (
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_update',
+    f'DROP TABLE IF EXISTS {SEARCH_TABLE}',
+)
+MATCHING_IDS = (
+    f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s'
+)
+SNIPPET = (
+    f"snippet({SEARCH_TABLE}, 0, char(2), char(3), '…', {SNIPPET_TOKENS})"
+)
+
+
+def install_search_index(connection):
+    """Создаёт индекс и триггеры, если их нет. SQLite теряет триггеры,
+    когда миграции пересоздают таблицу постов, поэтому функция
+    вызывается и после каждой миграции."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        tables = connection.introspection.table_names(cursor)
+        if 'posts_post' not in tables:
+            return
+        created = SEARCH_TABLE not in tables
+        cursor.execute(CREATE_TABLE)
+        for sql in CREATE_TRIGGERS:
+            cursor.execute(sql)
+        if created:
+            cursor.execute(REBUILD)
+
+
+def uninstall_search_index(connection):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for sql in DROP:
+            cursor.execute(sql)
+
+
+def match_expression(query):
+    """Запрос пользователя в синтаксисе FTS5: каждое слово в кавычках,
+    чтобы операторы и спецсимволы не ломали MATCH."""
+    return ' '.join(
+        '"{}"'.format(word.replace('"', '""')) for word in query.split()
+    )
+
+
+def highlight(snippet):
+    """Экранирует фрагмент текста и выделяет совпадения тегом <mark>."""
+    return mark_safe(
+        escape(snippet)
+        .replace(MATCH_START, '<mark>')
+        .replace(MATCH_END, '</mark>')
+    )
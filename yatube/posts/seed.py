@@ -0,0 +1,190 @@
+"""Наполнение базы данными для нагрузочных замеров.
+
+Распределения похожи на настоящие: число постов автора убывает по
+степенному закону (несколько авторов пишут большую часть постов), так
+же неравномерно посты делятся между группами, а даты публикации
+сгущаются к текущему моменту. Посты готовятся и пишутся пачками через
+bulk_create в нескольких процессах; сигналы при этом не срабатывают,
+поэтому счётчики и полнотекстовый индекс обновляются в конце.
+"""
+import multiprocessing
+import random
+from contextlib import contextmanager, nullcontext
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from faker import Faker
+
+from . import search
+from .counters import recount
+from .models import Group, Post, User
+
+# Доля постов без группы
+NO_GROUP_SHARE = 0.3
+# Показатель степенного закона для авторов и групп
+AUTHOR_EXPONENT = 1.2
+GROUP_EXPONENT = 1.0
+SENTENCES = 500
+MAX_SENTENCES_PER_POST = 8
+
+# Общая для процессов пула блокировка записи: SQLite допускает одного
+# пишущего, и процессы готовят посты параллельно, а пишут по очереди
+_write_lock = None
+
+
+def init_worker(write_lock):
+    global _write_lock
+    _write_lock = write_lock
+
+
+def zipf_weights(count, exponent):
+    """Накопленные веса: у i-го по популярности - 1 / i ** exponent."""
+    weights = []
+    total = 0
+    for rank in range(1, count + 1):
+        total += 1 / rank ** exponent
+        weights.append(total)
+    return weights
+
+
+@contextmanager
+def explicit_dates():
+    """Отключает auto_now_add и auto_now у дат поста: иначе bulk_create
+    затрёт сгенерированные даты текущим временем."""
+    pub_date = Post._meta.get_field('pub_date')
+    updated = Post._meta.get_field('updated')
+    pub_date.auto_now_add = updated.auto_now = False
+    try:
+        yield
+    finally:
+        pub_date.auto_now_add = updated.auto_now = True
+
+
+def create_users(count, prefix, locale):
+    fake = Faker(locale)
+    User.objects.bulk_create(
+        [
+            User(
+                username=f'{prefix}{number}',
+                first_name=fake.first_name(),
+                last_name=fake.last_name(),
+                password='!',
+            )
+            for number in range(count)
+        ],
+        ignore_conflicts=True,
+    )
+    return ranked_ids(User, 'username', prefix, count)
+
+
+def create_groups(count, prefix, locale):
+    fake = Faker(locale)
+    Group.objects.bulk_create(
+        [
+            Group(
+                title=fake.catch_phrase()[:200],
+                slug=f'{prefix}-{number}',
+                description=fake.paragraph(),
+            )
+            for number in range(count)
+        ],
+        ignore_conflicts=True,
+    )
+    return ranked_ids(Group, 'slug', f'{prefix}-', count)
+
+
+def ranked_ids(model, field, prefix, count):
+    """pk объектов prefix0, prefix1, ... в порядке номера: номер - ранг
+    в степенном распределении."""
+    ids = dict(
+        model.objects.filter(**{f'{field}__startswith': prefix})
+        .values_list(field, 'pk')
+    )
+    return [ids[f'{prefix}{number}'] for number in range(count)]
+
+
+def make_posts(count, authors, groups, days, rng, sentences):
+    now = timezone.now()
+    author_weights = zipf_weights(len(authors), AUTHOR_EXPONENT)
+    group_weights = zipf_weights(len(groups), GROUP_EXPONENT)
+    posts = []
+    for author_id in rng.choices(authors, cum_weights=author_weights,
+                                 k=count):
+        group_id = None
+        if groups and rng.random() >= NO_GROUP_SHARE:
+            group_id = rng.choices(groups, cum_weights=group_weights)[0]
+        # Квадрат сгущает даты к текущему моменту: активность растёт
+        pub_date = now - timedelta(days=days * rng.random() ** 2)
+        posts.append(Post(
+            author_id=author_id,
+            group_id=group_id,
+            text=' '.join(rng.sample(
+                sentences, rng.randint(1, MAX_SENTENCES_PER_POST)
+            )),
+            pub_date=pub_date,
+            updated=pub_date,
+        ))
+    return posts
+
+
+def seed_posts(job):
+    """Пишет count постов пачками по batch_size; выполняется в процессе
+    пула. Возвращает число созданных постов."""
+    count, batch_size, authors, groups, days, locale, seed = job
+    rng = random.Random(seed)
+    fake = Faker(locale)
+    fake.seed_instance(seed)
+    sentences = [fake.sentence(nb_words=12) for _ in range(SENTENCES)]
+    created = 0
+    with explicit_dates():
+        while created < count:
+            posts = make_posts(
+                min(batch_size, count - created), authors, groups, days,
+                rng, sentences
+            )
+            # Размер INSERT под лимиты SQLite Django выбирает сам,
+            # пачка целиком пишется одной транзакцией
+            with _write_lock or nullcontext(), transaction.atomic():
+                Post.objects.bulk_create(posts)
+            created += len(posts)
+    return created
+
+
+def seed(users, groups, posts, days=365, batch_size=5000, workers=1,
+         prefix='seed', locale='ru_RU', random_seed=None):
+    """Создаёт пользователей и группы (уже созданные с тем же prefix
+    переиспользуются) и posts постов. Возвращает число новых постов."""
+    author_ids = create_users(users, prefix, locale)
+    group_ids = create_groups(groups, prefix, locale)
+    rng = random.Random(random_seed)
+    chunk = max(-(-posts // max(workers, 1)), 1)
+    jobs = [
+        (
+            min(chunk, posts - start), batch_size, author_ids, group_ids,
+            days, locale, rng.getrandbits(64)
+        )
+        for start in range(0, posts, chunk)
+    ]
+    # Триггеры индекса поиска замедляют вставку: индекс строится заново
+    # одним проходом после наполнения
+    search.uninstall_search_index(connection)
+    try:
+        if workers > 1:
+            # Процессы пула получают копию настроенного Django через
+            # fork и не должны делить с родителем открытые соединения
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            write_lock = None
+            if connection.vendor == 'sqlite':
+                write_lock = context.Lock()
+            with context.Pool(workers, init_worker, (write_lock,)) as pool:
+                created = sum(pool.map(seed_posts, jobs))
+        else:
+            created = sum(map(seed_posts, jobs))
+    finally:
+        search.install_search_index(connection)
+    recount()
+    cache.clear()
+    return created
@@ -0,0 +1,75 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, tasks
+from .cache import (
+    group_feed, index_feed, invalidate_feeds, invalidate_post_feeds
+)
+from .models import Group, Post
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_state(sender, instance, **kwargs):
+    """Запоминает автора, группу и картинку поста до сохранения: при
+    смене автора и группы счётчики переносятся (редактирование,
+    list_editable в админке), новой картинке нужны новые копии."""
+    instance._previous = (
+        Post.objects.filter(pk=instance.pk)
+        .values_list('author_id', 'group_id', 'image').first()
+        if instance.pk else None
+    )
+    if instance._previous and (
+        (instance.image.name or '') != instance._previous[2]
+    ):
+        instance.image_srcset = ''
+
+
+@receiver(post_save, sender=Post)
+def update_counters_on_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous', None)
+    if created or previous is None:
+        counters.change_author_count(instance.author_id, 1)
+        counters.change_group_count(instance.group_id, 1)
+        invalidate_post_feeds([instance.author_id], [instance.group_id])
+        if created:
+            tasks.fan_out.enqueue(
+                instance.pk, key=f'posts.fan_out:{instance.pk}'
+            )
+        return
+    author_id, group_id, _ = previous
+    invalidate_post_feeds(
+        {author_id, instance.author_id}, {group_id, instance.group_id}
+    )
+    if author_id != instance.author_id:
+        counters.change_author_count(author_id, -1)
+        counters.change_author_count(instance.author_id, 1)
+        # Пост сменил автора: он должен быть в лентах других подписчиков
+        tasks.fan_out.enqueue(instance.pk, True)
+    if group_id != instance.group_id:
+        counters.change_group_count(group_id, -1)
+        counters.change_group_count(instance.group_id, 1)
+
+
+@receiver(post_save, sender=Post)
+def make_thumbnails_on_save(sender, instance, created, **kwargs):
+    """Уменьшенные копии новой картинки готовит обработчик задач."""
+    previous = getattr(instance, '_previous', None)
+    name = instance.image.name or ''
+    if name and name != (previous[2] if previous else ''):
+        tasks.make_thumbnails.enqueue(
+            instance.pk, name,
+            key=f'posts.make_thumbnails:{instance.pk}:{name}'
+        )
+
+
+@receiver(post_delete, sender=Post)
+def update_counters_on_delete(sender, instance, **kwargs):
+    counters.change_author_count(instance.author_id, -1)
+    counters.change_group_count(instance.group_id, -1)
+    invalidate_post_feeds([instance.author_id], [instance.group_id])
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_feeds(sender, instance, **kwargs):
+    """Название и описание группы видны в её ленте и в карточках постов."""
+    invalidate_feeds(index_feed(), group_feed(instance.slug))
@@ -0,0 +1,54 @@
+"""Потоковая отрисовка лент.
+
+Шаблон ленты отрисовывается один раз с меткой feed_marker вместо постов
+и пагинатора и делится по метке на начало и конец. Начало - head и шапка
+сайта - уходит клиенту до запроса постов, затем страница постов
+выбирается одним запросом, и карточки отрисовываются и отправляются по
+одной, последними - пагинатор и конец страницы. Время до первого байта
+не зависит от размера страницы, а отрисованная страница целиком
+собирается в памяти, только если её нужно положить в кэш.
+
+Тело собирается после выхода из middleware, поэтому профилирование,
+метрики и выбор реплики продолжают работу при его отдаче (см.
+core.instrumentation.within). Ошибка после отправки начала страницы
+уже не может сменить статус ответа: клиент получает страницу целиком,
+с сообщением об ошибке вместо постов, а исключение передаётся серверу.
+"""
+import secrets
+
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+# Случайная часть не даёт тексту поста совпасть с меткой
+FEED_MARKER = mark_safe(f'<!-- feed {secrets.token_hex(8)} -->')
+STREAM_ERROR = (
+    '<p class="text-danger">Не удалось загрузить посты. '
+    'Обновите страницу.</p>'
+)
+
+
+def stream_feed(request, template_name, context, get_page):
+    """Части страницы ленты; get_page() выбирает страницу постов и
+    вызывается только после отправки начала страницы."""
+    head, tail = render_to_string(
+        template_name, {**context, 'feed_marker': FEED_MARKER}, request
+    ).split(FEED_MARKER, 1)
+    yield head
+    try:
+        page = get_page()
+        card = get_template('includes/post_card.html')
+        for number, post in enumerate(page):
+            if number:
+                yield '<hr>'
+            yield card.render({'post': post})
+        yield render_to_string(
+            'posts/paginator.html', {'page_obj': page}, request
+        )
+    except Exception:
+        # Статус 200 уже отправлен: страница дописывается с сообщением
+        # об ошибке, а исключение уходит дальше - в метрики, лог
+        # сервера и мимо кэша
+        yield STREAM_ERROR
+        yield tail
+        raise
+    yield tail
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.utils import timezone
+from sorl.thumbnail import get_thumbnail
+
+from core.tasks import task, write_lock
+
+from . import timeline
+from .cache import invalidate_post_feeds
+from .models import Post, TimelineEntry
+
+
+@task
+def fan_out(post_id, replace=False):
+    """Раскладывает пост по лентам подписчиков; replace сначала убирает
+    его из лент - после смены автора поста."""
+    post = Post.objects.filter(pk=post_id).only(
+        'pk', 'author_id', 'pub_date'
+    ).first()
+    if post is None:
+        return
+    if replace:
+        entries = TimelineEntry.objects.filter(post=post)
+        timeline.invalidate_timelines(
+            entries.values_list('user_id', flat=True)
+        )
+        entries.delete()
+    timeline.fan_out(post)
+
+
+@task(atomic=False)
+def make_thumbnails(post_id, name):
+    """Готовит уменьшенные копии картинки поста шириной
+    POST_IMAGE_WIDTHS для srcset. Обработка картинок идёт вне
+    транзакции, чтобы не держать базу, но под write_lock: sorl
+    записывает сведения о копиях в свою таблицу."""
+    images = Post.objects.filter(pk=post_id, image=name)
+    post = images.only(
+        'image', 'image_width', 'image_height', 'author_id', 'group_id'
+    ).first()
+    if post is None:
+        # Пост удалён или картинку уже заменили
+        return
+    thumbnails = {}
+    for width in settings.POST_IMAGE_WIDTHS:
+        with write_lock():
+            thumbnail = get_thumbnail(
+                post.image, str(width), upscale=False, quality=85
+            )
+        thumbnails[thumbnail.width] = thumbnail.url
+    srcset = ', '.join(
+        f'{url} {width}w' for width, url in sorted(thumbnails.items())
+    )
+    with write_lock():
+        changed = images.update(
+            image_srcset=srcset, updated=timezone.now()
+        )
+    if changed:
+        invalidate_post_feeds([post.author_id], [post.group_id])
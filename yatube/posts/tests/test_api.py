@@ -0,0 +1,129 @@
+import json
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post, User
+from ..paginators import encode_cursor, NEXT, PREVIOUS
+
+NIK = 'testauthor_1'
+SLUG = 'test_slug'
+POSTS_SECOND_PAGE = 3
+API_POSTS_URL = reverse('posts:api_posts')
+API_GROUP_URL = reverse('posts:api_group_posts', args=[SLUG])
+API_PROFILE_URL = reverse('posts:api_profile_posts', args=[NIK])
+
+
+class PostApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=NIK)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug=SLUG,
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый текст {i}', author=cls.user, group=cls.group)
+            for i in range(settings.MAX_POSTS + POSTS_SECOND_PAGE)
+        )
+        cls.post = Post.objects.create(text='Без группы', author=cls.user)
+
+    def setUp(self):
+        self.guest = Client()
+
+    def get_json(self, url, **params):
+        response = self.guest.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_feeds_are_paginated_by_cursor(self):
+        expected = {
+            API_POSTS_URL: Post.objects.order_by('-pub_date', '-pk'),
+            API_GROUP_URL: self.group.posts.order_by('-pub_date', '-pk'),
+            API_PROFILE_URL: self.user.posts.order_by('-pub_date', '-pk'),
+        }
+        for url, posts in expected.items():
+            with self.subTest(url=url):
+                first = self.get_json(url)
+                self.assertIsNone(first['previous'])
+                second = self.get_json(url, cursor=first['next'])
+                self.assertIsNone(second['next'])
+                self.assertEqual(
+                    [post['id'] for post in first['results']
+                     + second['results']],
+                    [post.pk for post in posts]
+                )
+                back = self.get_json(url, cursor=second['previous'])
+                self.assertEqual(back['results'], first['results'])
+
+    def test_stale_cursor_returns_first_page(self):
+        """Курсор за последним постом отдаёт первую страницу целиком"""
+        oldest = Post.objects.order_by('pub_date', 'pk').first()
+        page = self.get_json(
+            API_POSTS_URL,
+            cursor=encode_cursor(NEXT, oldest.pub_date, oldest.pk)
+        )
+        self.assertEqual(len(page['results']), settings.MAX_POSTS)
+        self.assertIsNone(page['previous'])
+        self.assertIsNotNone(page['next'])
+
+    def test_cursor_with_out_of_range_pk(self):
+        oldest = Post.objects.order_by('pub_date', 'pk').first()
+        for direction, pk in ((NEXT, 10 ** 23), (PREVIOUS, -10 ** 23)):
+            with self.subTest(direction=direction, pk=pk):
+                page = self.get_json(
+                    API_POSTS_URL,
+                    cursor=encode_cursor(direction, oldest.pub_date, pk)
+                )
+                self.assertEqual(len(page['results']), settings.MAX_POSTS)
+                self.assertIsNone(page['previous'])
+
+    def test_empty_feed(self):
+        page = self.get_json(API_POSTS_URL)
+        Post.objects.all().delete()
+        page = self.get_json(API_POSTS_URL, cursor=page['next'])
+        self.assertEqual(
+            page, {'results': [], 'next': None, 'previous': None}
+        )
+
+    def test_sparse_fields_select_only_their_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get_json(API_POSTS_URL, fields='id,author')
+        self.assertEqual(set(data['results'][0]), {'id', 'author'})
+        self.assertEqual(data['results'][0]['author'], NIK)
+        sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('"text"', sql)
+        self.assertNotIn('posts_group', sql)
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.guest.get(API_POSTS_URL, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+    def test_post_detail(self):
+        url = reverse('posts:api_post_detail', args=[self.post.pk])
+        self.assertEqual(self.guest.get(url).json(), {
+            'id': self.post.pk,
+            'text': 'Без группы',
+            'pub_date': self.guest.get(
+                url, {'fields': 'pub_date'}
+            ).json()['pub_date'],
+            'author': NIK,
+            'group': None,
+        })
+
+    def test_missing_objects_are_404(self):
+        for url in (
+            reverse('posts:api_group_posts', args=['missing']),
+            reverse('posts:api_profile_posts', args=['missing']),
+            reverse('posts:api_post_detail', args=[0]),
+        ):
+            with self.subTest(url=url):
+                response = self.guest.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('error', response.json())
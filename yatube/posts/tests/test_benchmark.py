@@ -0,0 +1,110 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from ..benchmark import compare, load_test, percentile
+from ..models import Post, User
+
+ENDPOINTS = {
+    'index', 'group_posts', 'profile', 'profile_deep', 'post_detail',
+    'post_create', 'admin_changelist',
+}
+
+
+@override_settings(BENCHMARK_DISPOSABLE_DATABASE=True)
+class BenchmarkTest(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, directory)
+        self.output = os.path.join(directory, 'results.json')
+        self.addCleanup(
+            lambda: os.path.exists(self.output) and os.remove(self.output)
+        )
+
+    def bench(self, **options):
+        call_command(
+            'bench_endpoints', posts=40, repeat=2, stdout=StringIO(),
+            **options
+        )
+        with open(self.output) as results:
+            return json.load(results)
+
+    def test_results_are_saved_and_changes_rolled_back(self):
+        results = self.bench(output=self.output)
+        self.assertEqual(set(results['endpoints']), ENDPOINTS)
+        self.assertEqual(results['meta']['posts'], 40)
+        for name, metrics in results['endpoints'].items():
+            with self.subTest(endpoint=name):
+                self.assertGreater(metrics['queries'], 0)
+                self.assertGreater(metrics['memory_kb'], 0)
+                self.assertLessEqual(metrics['p50_ms'], metrics['p99_ms'])
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+    def test_site_cache_is_kept(self):
+        cache.set('site-page', 'страница')
+        self.bench(output=self.output, only=['index'])
+        self.assertEqual(cache.get('site-page'), 'страница')
+
+    @override_settings(BENCHMARK_DISPOSABLE_DATABASE=False)
+    def test_refuses_shared_database(self):
+        for command in ('bench_endpoints', 'bench_asgi'):
+            with self.subTest(command=command):
+                with self.assertRaisesMessage(CommandError, 'DEBUG'):
+                    call_command(command, posts=40, stdout=StringIO())
+                self.assertFalse(Post.objects.exists())
+
+    def test_regression_against_baseline_fails(self):
+        results = self.bench(output=self.output, only=['post_detail'])
+        results['endpoints']['post_detail']['queries'] -= 1
+        with open(self.output, 'w') as baseline:
+            json.dump(results, baseline)
+        with self.assertRaisesMessage(CommandError, 'post_detail.queries'):
+            call_command(
+                'bench_endpoints', posts=40, repeat=2, only=['post_detail'],
+                baseline=self.output, stdout=StringIO()
+            )
+
+
+class CompareTest(SimpleTestCase):
+    def test_only_growth_beyond_threshold_is_a_regression(self):
+        baseline = {'endpoints': {
+            'index': {'p50_ms': 10, 'queries': 3},
+            'profile': {'p50_ms': 10, 'queries': 3},
+        }}
+        results = {'endpoints': {
+            'index': {'p50_ms': 12, 'queries': 3},
+            'profile': {'p50_ms': 13, 'queries': 4},
+            'post_create': {'p50_ms': 100, 'queries': 30},
+        }}
+        self.assertEqual(
+            [line.split(':')[0] for line in compare(
+                results, baseline, {'p50_ms': 0.25, 'queries': 0}
+            )],
+            ['profile.p50_ms', 'profile.queries']
+        )
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+
+
+@override_settings(BENCHMARK_DISPOSABLE_DATABASE=True)
+class LoadTestTest(SimpleTestCase):
+    def test_every_pool_size_is_measured(self):
+        results = load_test(
+            reverse('about:author'), requests=6, concurrency=3,
+            threads=(1, 3), query_delay=0
+        )
+        self.assertEqual(set(results), {1, 3})
+        for metrics in results.values():
+            self.assertGreater(metrics['requests_per_second'], 0)
+            self.assertLessEqual(metrics['p50_ms'], metrics['p95_ms'])
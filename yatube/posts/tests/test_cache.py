@@ -0,0 +1,162 @@
+import time
+import warnings
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..cache import (
+    FEED_COUNT_KEY, feed_count, feed_digest, feed_version,
+    feed_version_key, group_feed
+)
+from ..models import Group, Post, User
+
+NIK = 'testauthor_1'
+NIK_2 = 'testauthor_2'
+SLUG = 'test_slug'
+SLUG_2 = 'test_slug_2'
+MAIN_URL = reverse('posts:index')
+GROUP_URL = reverse('posts:group_list', args=[SLUG])
+GROUP_2_URL = reverse('posts:group_list', args=[SLUG_2])
+PROFILE_URL = reverse('posts:profile', args=[NIK])
+PROFILE_2_URL = reverse('posts:profile', args=[NIK_2])
+NEW_POST_URL = reverse('posts:post_create')
+
+
+class FeedCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=NIK)
+        cls.user_2 = User.objects.create_user(username=NIK_2)
+        cls.group = Group.objects.create(
+            title='Тестовая группа 1',
+            slug=SLUG,
+            description='Тестовое описание',
+        )
+        cls.group_2 = Group.objects.create(
+            title='Тестовая группа 2',
+            slug=SLUG_2,
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Первый пост', author=cls.user_2, group=cls.group_2
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+        self.author = Client()
+        self.author.force_login(self.user)
+
+    def test_feed_pages_are_cached(self):
+        """Повторный запрос страницы ленты не обращается к базе"""
+        for url in (MAIN_URL, GROUP_2_URL, PROFILE_2_URL):
+            with self.subTest(url=url):
+                content = self.guest.get(url).content
+                with self.assertNumQueries(0):
+                    self.assertEqual(self.guest.get(url).content, content)
+
+    def test_cache_is_separate_for_pages_and_viewers(self):
+        """Разные страницы и пользователи не получают чужой кэш"""
+        self.guest.get(MAIN_URL)
+        with CaptureQueriesContext(connection) as queries:
+            self.guest.get(MAIN_URL, {'page': 2})
+        self.assertTrue(queries.captured_queries)
+        self.assertIn(NIK.encode(), self.author.get(MAIN_URL).content)
+        self.assertNotIn(NIK.encode(), self.guest.get(MAIN_URL).content)
+
+    def test_new_post_invalidates_only_affected_feeds(self):
+        """Новый пост сбрасывает общую ленту, профиль и группу автора"""
+        for url in (
+            MAIN_URL, GROUP_URL, GROUP_2_URL, PROFILE_URL, PROFILE_2_URL
+        ):
+            self.guest.get(url)
+        self.author.post(
+            NEW_POST_URL, {'text': 'Новый пост', 'group': self.group.pk}
+        )
+        for url in (MAIN_URL, GROUP_URL, PROFILE_URL):
+            with self.subTest(url=url):
+                self.assertIn(
+                    'Новый пост', self.guest.get(url).content.decode()
+                )
+        for url in (GROUP_2_URL, PROFILE_2_URL):
+            with self.subTest(url=url):
+                with self.assertNumQueries(0):
+                    self.guest.get(url)
+
+    def test_group_change_invalidates_both_groups(self):
+        """Перенос поста в другую группу сбрасывает обе ленты групп"""
+        self.guest.get(GROUP_URL)
+        self.guest.get(GROUP_2_URL)
+        self.post.group = self.group
+        self.post.save()
+        self.assertIn(
+            'Первый пост', self.guest.get(GROUP_URL).content.decode()
+        )
+        self.assertNotIn(
+            'Первый пост', self.guest.get(GROUP_2_URL).content.decode()
+        )
+
+    @override_settings(FEED_VERSION_TIMEOUT=60)
+    def test_version_keys_are_safe_and_expire(self):
+        """Ключ версии не зависит от символов слага и хранится
+        FEED_VERSION_TIMEOUT секунд"""
+        feed = group_feed('Тестовый слаг с пробелами')
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            version = feed_version(feed)
+        self.assertEqual(caught, [])
+        self.assertEqual(cache.get(feed_version_key(feed)), version)
+        key = cache.make_key(feed_version_key(feed))
+        self.assertLessEqual(
+            cache._expire_info[key] - time.time(), 60
+        )
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            count = feed_count(feed, Post.objects.none())
+        self.assertEqual(caught, [])
+        self.assertEqual(cache.get(
+            FEED_COUNT_KEY.format(feed_digest(feed), version)
+        ), count)
+
+
+@override_settings(FEED_CACHE_TIMEOUT=0)
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=NIK)
+        cls.post = Post.objects.create(text='Первый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+
+    def test_card_is_cached_until_post_changes(self):
+        """Карточка поста берётся из кэша, пока пост не изменён"""
+        self.guest.get(MAIN_URL)
+        Post.objects.filter(pk=self.post.pk).update(text='Тайная правка')
+        self.assertNotIn(
+            'Тайная правка', self.guest.get(MAIN_URL).content.decode()
+        )
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.assertIn(
+            'Новый текст', self.guest.get(MAIN_URL).content.decode()
+        )
+
+    def test_card_follows_author_and_group_changes(self):
+        """Имя автора и название группы в карточке не устаревают"""
+        group = Group.objects.create(title='Старое название', slug=SLUG)
+        Post.objects.filter(pk=self.post.pk).update(group=group)
+        self.guest.get(MAIN_URL)
+        group.title = 'Новое название'
+        group.save()
+        self.user.first_name = 'Лев'
+        self.user.save()
+        content = self.guest.get(MAIN_URL).content.decode()
+        self.assertIn('Новое название', content)
+        self.assertIn('Лев', content)
@@ -0,0 +1,80 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post, User
+
+NIK = 'testauthor_1'
+SLUG = 'test_slug'
+MAIN_URL = reverse('posts:index')
+GROUP_URL = reverse('posts:group_list', args=[SLUG])
+PROFILE_URL = reverse('posts:profile', args=[NIK])
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=NIK)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug=SLUG,
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.user, group=cls.group
+        )
+        cls.POST_PAGE_URL = reverse('posts:post_detail', args=[cls.post.pk])
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+
+    def test_unchanged_feed_returns_304_without_queries(self):
+        for url in (MAIN_URL, GROUP_URL, PROFILE_URL):
+            with self.subTest(url=url):
+                response = self.guest.get(url)
+                self.assertIn('no-cache', response['Cache-Control'])
+                with self.assertNumQueries(0):
+                    response = self.guest.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_feed_validators_change_with_feed(self):
+        """Новый пост меняет ETag общей ленты, профиля и группы"""
+        etags = {url: self.guest.get(url)['ETag']
+                 for url in (MAIN_URL, GROUP_URL, PROFILE_URL)}
+        Post.objects.create(text='Ещё пост', author=self.user,
+                            group=self.group)
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.guest.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_feed_etag_depends_on_page_and_viewer(self):
+        etag = self.guest.get(MAIN_URL)['ETag']
+        self.assertNotEqual(self.guest.get(MAIN_URL, {'page': 2})['ETag'],
+                            etag)
+        author = Client()
+        author.force_login(self.user)
+        self.assertNotEqual(author.get(MAIN_URL)['ETag'], etag)
+
+    def test_post_detail_conditional_get(self):
+        """Страница поста отвечает 304 после одной выборки по ключу,
+        пока пост не изменён"""
+        response = self.guest.get(self.POST_PAGE_URL)
+        with self.assertNumQueries(1):
+            not_modified = self.guest.get(
+                self.POST_PAGE_URL, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(not_modified.status_code, 304)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.assertEqual(self.guest.get(
+            self.POST_PAGE_URL, HTTP_IF_NONE_MATCH=response['ETag']
+        ).status_code, 200)
+
+    def test_missing_post_is_404(self):
+        response = self.guest.get(reverse('posts:post_detail', args=[0]))
+        self.assertEqual(response.status_code, 404)
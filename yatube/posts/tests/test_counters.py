@@ -0,0 +1,70 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import AuthorStats, Group, Post, User
+
+NIK = 'testauthor_1'
+NEW_POST_URL = reverse('posts:post_create')
+
+
+class PostCountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=NIK)
+        cls.group = Group.objects.create(
+            title='Тестовая группа 1',
+            slug='test_slug_1',
+            description='Тестовое описание',
+        )
+        cls.group_2 = Group.objects.create(
+            title='Тестовая группа 2',
+            slug='test_slug_2',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.author = Client()
+        self.author.force_login(self.user)
+
+    def assert_counts(self, author, group, group_2):
+        self.group.refresh_from_db()
+        self.group_2.refresh_from_db()
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.user).post_count, author
+        )
+        self.assertEqual(self.group.post_count, group)
+        self.assertEqual(self.group_2.post_count, group_2)
+
+    def test_counters_follow_create_edit_delete(self):
+        """Счётчики меняются при создании, смене группы и удалении поста"""
+        self.author.post(
+            NEW_POST_URL, {'text': 'Пост', 'group': self.group.pk}
+        )
+        self.author.post(NEW_POST_URL, {'text': 'Без группы'})
+        self.assert_counts(2, 1, 0)
+        post = Post.objects.get(group=self.group)
+        self.author.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            {'text': 'Пост', 'group': self.group_2.pk}
+        )
+        self.assert_counts(2, 0, 1)
+        post.refresh_from_db()
+        post.group = None
+        post.save()
+        self.assert_counts(2, 0, 0)
+        Post.objects.all().delete()
+        self.assert_counts(0, 0, 0)
+
+    def test_recount_repairs_drifted_counters(self):
+        """Команда recount_posts исправляет разошедшиеся счётчики"""
+        Post.objects.bulk_create(
+            Post(text=f'Текст {i}', author=self.user, group=self.group)
+            for i in range(5)
+        )
+        Group.objects.filter(pk=self.group_2.pk).update(post_count=7)
+        call_command('recount_posts', stdout=StringIO())
+        self.assert_counts(5, 5, 0)
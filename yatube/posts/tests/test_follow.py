@@ -0,0 +1,171 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.tasks import run_pending
+
+from ..models import AuthorStats, Follow, Post, TimelineEntry, User
+from .test_query_plans import query_plan
+
+NIK = 'testauthor_1'
+NIK_2 = 'testauthor_2'
+READER = 'reader'
+FOLLOW_URL = reverse('posts:follow_index')
+FOLLOW_AUTHOR_URL = reverse('posts:profile_follow', args=[NIK])
+UNFOLLOW_AUTHOR_URL = reverse('posts:profile_unfollow', args=[NIK])
+PROFILE_URL = reverse('posts:profile', args=[NIK])
+TIMELINE_TABLE = TimelineEntry._meta.db_table
+ADMIN_ADD_URL = reverse('admin:posts_follow_add')
+ADMIN_CHANGELIST_URL = reverse('admin:posts_follow_changelist')
+
+
+@override_settings(FEED_CACHE_TIMEOUT=0)
+class FollowTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=NIK)
+        cls.user_2 = User.objects.create_user(username=NIK_2)
+        cls.reader = User.objects.create_user(username=READER)
+        cls.old_post = Post.objects.create(text='Старый пост', author=cls.user)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed(self):
+        return [
+            entry.post.text
+            for entry in self.client.get(FOLLOW_URL).context['page_obj']
+        ]
+
+    def follower_count(self):
+        return AuthorStats.objects.get(author=self.user).follower_count
+
+    def test_follow_and_unfollow(self):
+        """Подписка добавляет посты автора в ленту, отписка убирает"""
+        self.assertRedirects(
+            self.client.get(FOLLOW_AUTHOR_URL), PROFILE_URL
+        )
+        self.client.get(FOLLOW_AUTHOR_URL)
+        self.assertEqual(Follow.objects.filter(user=self.reader).count(), 1)
+        self.assertEqual(self.follower_count(), 1)
+        self.assertEqual(self.feed(), [self.old_post.text])
+        self.assertTrue(
+            self.client.get(PROFILE_URL).context['following']
+        )
+        self.assertRedirects(
+            self.client.get(UNFOLLOW_AUTHOR_URL), PROFILE_URL
+        )
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(self.follower_count(), 0)
+        self.assertEqual(self.feed(), [])
+
+    def test_cannot_follow_self(self):
+        author = Client()
+        author.force_login(self.user)
+        author.get(FOLLOW_AUTHOR_URL)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_admin_follows_go_through_timeline(self):
+        """Подписка из админки ведёт себя как подписка на сайте"""
+        admin = Client()
+        admin.force_login(User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        ))
+        response = admin.post(ADMIN_ADD_URL, {
+            'user': self.reader.pk, 'author': self.user.pk
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.follower_count(), 1)
+        self.assertEqual(self.feed(), [self.old_post.text])
+        for data in (
+            {'user': self.reader.pk, 'author': self.user.pk},
+            {'user': self.user.pk, 'author': self.user.pk},
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(
+                    admin.post(ADMIN_ADD_URL, data).status_code, 200
+                )
+        admin.post(ADMIN_CHANGELIST_URL, {
+            'action': 'delete_selected', 'post': 'yes',
+            '_selected_action': Follow.objects.values_list('pk', flat=True),
+        })
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(self.follower_count(), 0)
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(FEED_CACHE_TIMEOUT=60, MAX_POSTS=1)
+    def test_feed_count_is_cached_until_timeline_changes(self):
+        """Число записей ленты подписок считается один раз на версию
+        ленты; раскладка, подписка и отписка его сбрасывают"""
+        cache.clear()
+        self.client.get(FOLLOW_AUTHOR_URL)
+        self.client.get(FOLLOW_URL)
+        with CaptureQueriesContext(connection) as queries:
+            page = self.client.get(FOLLOW_URL).context['page_obj']
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if 'COUNT(' in query['sql']
+        ])
+        self.assertEqual(page.paginator.num_pages, 1)
+        Post.objects.create(text='Новый пост', author=self.user)
+        run_pending()
+        page = self.client.get(FOLLOW_URL).context['page_obj']
+        self.assertEqual(page.paginator.num_pages, 2)
+        self.client.get(UNFOLLOW_AUTHOR_URL)
+        page = self.client.get(FOLLOW_URL).context['page_obj']
+        self.assertEqual(page.paginator.count, 0)
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        """Новый пост попадает только в ленты подписчиков автора"""
+        self.client.get(FOLLOW_AUTHOR_URL)
+        Post.objects.create(text='Новый пост', author=self.user)
+        Post.objects.create(text='Чужой пост', author=self.user_2)
+        self.assertFalse(TimelineEntry.objects.filter(post__text='Новый пост'))
+        run_pending()
+        self.assertEqual(self.feed(), ['Новый пост', self.old_post.text])
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user_2))
+
+    def test_popular_author_posts_are_pulled(self):
+        """Посты популярного автора не раскладываются при записи,
+        а забираются в ленту при её чтении"""
+        self.client.get(FOLLOW_AUTHOR_URL)
+        with self.settings(FOLLOW_FANOUT_LIMIT=0):
+            post = Post.objects.create(text='Новый пост', author=self.user)
+            run_pending()
+            self.assertFalse(TimelineEntry.objects.filter(post=post))
+            self.assertEqual(self.feed(), ['Новый пост', self.old_post.text])
+
+    def test_feed_is_index_range_scan(self):
+        """Лента подписок читается по индексу без сортировки"""
+        self.client.get(FOLLOW_AUTHOR_URL)
+        Post.objects.bulk_create(
+            Post(text=f'Текст {i}', author=self.user) for i in range(15)
+        )
+        # bulk_create не шлёт сигналов: записи ленты создаются вручную
+        TimelineEntry.objects.bulk_create((
+            TimelineEntry(user=self.reader, post=post, pub_date=post.pub_date)
+            for post in Post.objects.filter(author=self.user)
+        ), ignore_conflicts=True)
+        first = self.client.get(FOLLOW_URL, {'cursor': ''})
+        for params in (
+            {}, {'page': 2},
+            {'cursor': first.context['page_obj'].next_cursor},
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(FOLLOW_URL, params)
+            timeline_queries = [
+                query['sql'] for query in queries
+                if f'FROM "{TIMELINE_TABLE}"' in query['sql']
+            ]
+            self.assertTrue(timeline_queries)
+            for sql in timeline_queries:
+                for step in query_plan(sql):
+                    with self.subTest(params=params, sql=sql):
+                        self.assertNotIn('TEMP B-TREE', step)
+                        self.assertFalse(
+                            step.startswith(f'SCAN {TIMELINE_TABLE}')
+                        )
@@ -0,0 +1,122 @@
+import hashlib
+import shutil
+import tempfile
+import threading
+from io import BytesIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.models import Task
+from core.tasks import SQLITE_WRITE_LOCK, run_pending
+
+from .. import tasks
+from ..models import Post, User
+
+NIK = 'testauthor_1'
+NEW_POST_URL = reverse('posts:post_create')
+MAIN_URL = reverse('posts:index')
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def write_lock_is_held():
+    """Занят ли SQLITE_WRITE_LOCK: проверка из другого потока."""
+    acquired = []
+
+    def probe():
+        if SQLITE_WRITE_LOCK.acquire(blocking=False):
+            SQLITE_WRITE_LOCK.release()
+            acquired.append(True)
+    thread = threading.Thread(target=probe)
+    thread.start()
+    thread.join()
+    return not acquired
+
+
+def make_image(width=1200, height=600):
+    content = BytesIO()
+    Image.new('RGB', (width, height), 'lightskyblue').save(content, 'PNG')
+    return content.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, FEED_CACHE_TIMEOUT=0)
+class PostImageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=NIK)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = Client()
+        self.author.force_login(self.user)
+
+    def create_post(self, content):
+        self.author.post(NEW_POST_URL, {
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile('Фото.PNG', content, 'image/png'),
+        })
+        return Post.objects.get()
+
+    def test_image_is_stored_under_content_hash(self):
+        """Картинка сохраняется под именем по содержимому с размерами"""
+        content = make_image()
+        post = self.create_post(content)
+        digest = hashlib.sha256(content).hexdigest()
+        self.assertEqual(post.image.name, f'posts/{digest[:2]}/{digest}.png')
+        self.assertEqual((post.image_width, post.image_height), (1200, 600))
+
+    def test_thumbnails_are_made_by_worker(self):
+        """Копии готовит обработчик задач, а до этого лента показывает
+        исходную картинку с размерами"""
+        post = self.create_post(make_image())
+        self.assertEqual(post.image_srcset, '')
+        self.assertTrue(Task.objects.filter(name__endswith='make_thumbnails'))
+        content = self.author.get(MAIN_URL).content.decode()
+        self.assertIn(f'src="{post.image.url}"', content)
+        self.assertIn('width="1200" height="600"', content)
+        self.assertNotIn('srcset', content)
+
+        run_pending()
+        post.refresh_from_db()
+        widths = [
+            candidate.split()[1] for candidate in post.image_srcset.split(', ')
+        ]
+        self.assertEqual(widths, ['320w', '640w', '960w'])
+        self.assertIn(
+            f'srcset="{post.image_srcset}"',
+            self.author.get(MAIN_URL).content.decode()
+        )
+
+    def test_small_image_is_not_upscaled(self):
+        post = self.create_post(make_image(400, 300))
+        run_pending()
+        post.refresh_from_db()
+        widths = [
+            candidate.split()[1] for candidate in post.image_srcset.split(', ')
+        ]
+        self.assertEqual(widths, ['320w', '400w'])
+
+    def test_thumbnails_are_made_under_write_lock(self):
+        """sorl пишет в свою таблицу под тем же замком, что и задачи"""
+        post = self.create_post(make_image())
+        held = []
+        get_thumbnail = tasks.get_thumbnail
+
+        def checked(*args, **kwargs):
+            held.append(write_lock_is_held())
+            return get_thumbnail(*args, **kwargs)
+        with mock.patch.object(tasks, 'get_thumbnail', checked):
+            run_pending()
+        self.assertEqual(held, [True] * 3)
+        post.refresh_from_db()
+        self.assertTrue(post.image_srcset)
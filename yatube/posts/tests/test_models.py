@@ -1,4 +1,8 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils.text import Truncator
 
 from ..models import Group, Post, User, STRING_FROM_POST
 
@@ -75,3 +79,27 @@ class PostModelTest(TestCase):
             self.post.text,
         ), str(self.post))
         self.assertEqual(self.group.title, str(self.group))
+
+    def test_text_is_rendered_on_save(self):
+        """HTML и начало текста готовятся при сохранении и bulk_create"""
+        text = '<b>Первая строка</b>\nВторая строка, длинная-длинная'
+        post = Post.objects.create(author=self.user, text=text)
+        bulk_post, = Post.objects.bulk_create([
+            Post(author=self.user, text=text)
+        ])
+        for post in (post, bulk_post):
+            with self.subTest(post=post.pk):
+                self.assertEqual(
+                    post.text_html,
+                    '&lt;b&gt;Первая строка&lt;/b&gt;<br>'
+                    'Вторая строка, длинная-длинная'
+                )
+                self.assertEqual(post.excerpt, Truncator(text).chars(30))
+
+    def test_render_posts_fills_missing_html(self):
+        """Команда render_posts заполняет HTML у старых постов"""
+        Post.objects.filter(pk=self.post.pk).update(text_html='', excerpt='')
+        call_command('render_posts', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text_html, 'Тестовый пост')
+        self.assertEqual(self.post.excerpt, 'Тестовый пост')
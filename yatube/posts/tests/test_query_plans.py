@@ -0,0 +1,69 @@
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post, User
+
+SLUG = 'test_slug'
+NIK = 'testauthor_1'
+MAIN_URL = reverse('posts:index')
+GROUP_URL = reverse('posts:group_list', args=[SLUG])
+PROFILE_URL = reverse('posts:profile', args=[NIK])
+POST_TABLE = Post._meta.db_table
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+@override_settings(FEED_CACHE_TIMEOUT=0)
+class FeedQueryPlanTest(TestCase):
+    """Запросы лент идут по индексам: без полного сканирования
+    таблицы постов и без сортировки во временном B-дереве."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=NIK)
+        cls.group = Group.objects.create(
+            title='Тест-название',
+            slug=SLUG,
+            description='Тест-описание'
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Текст {i}', author=cls.user, group=cls.group)
+            for i in range(30)
+        )
+        cls.guest = Client()
+
+    def assert_plans_use_indexes(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            self.guest.get(url, params)
+        post_queries = [
+            query['sql'] for query in queries
+            if f'FROM "{POST_TABLE}"' in query['sql']
+        ]
+        self.assertTrue(post_queries)
+        for sql in post_queries:
+            for step in query_plan(sql):
+                with self.subTest(url=url, params=params, sql=sql):
+                    self.assertNotIn('TEMP B-TREE', step)
+                    if step.startswith(f'SCAN {POST_TABLE}'):
+                        self.assertIn('INDEX', step)
+
+    def test_feed_query_plans(self):
+        for url in (MAIN_URL, GROUP_URL, PROFILE_URL):
+            first = self.guest.get(url, {'cursor': ''}).context['page_obj']
+            second = self.guest.get(
+                url, {'cursor': first.next_cursor}
+            ).context['page_obj']
+            for params in (
+                {},
+                {'page': 2},
+                {'cursor': first.next_cursor},
+                {'cursor': second.previous_cursor},
+            ):
+                self.assert_plans_use_indexes(url, params)
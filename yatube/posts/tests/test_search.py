@@ -0,0 +1,82 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post, User
+
+NIK = 'testauthor_1'
+SEARCH_URL = reverse('posts:search')
+ADMIN_URL = reverse('admin:posts_post_changelist')
+
+
+class PostSearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_superuser(
+            username=NIK, email='author@yatube.ru', password='password'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Кошка <b>спит</b> на окне'
+        )
+        cls.post_2 = Post.objects.create(
+            author=cls.user, text='Собака и кошка, кошка и собака'
+        )
+        cls.post_3 = Post.objects.create(
+            author=cls.user, text='Про погоду'
+        )
+
+    def setUp(self):
+        self.guest = Client()
+
+    def search(self, query, **params):
+        response = self.guest.get(SEARCH_URL, {'q': query, **params})
+        return list(response.context['page_obj'])
+
+    def test_search_ranks_matches(self):
+        """Поиск не учитывает регистр и сортирует по релевантности"""
+        self.assertEqual(self.search('КОШКА'), [self.post_2, self.post])
+        self.assertEqual(self.search('кошка собака'), [self.post_2])
+        self.assertEqual(self.search('слон'), [])
+
+    def test_search_tolerates_fts_syntax(self):
+        """Спецсимволы FTS5 в запросе не приводят к ошибке"""
+        for query in ('"', 'кошка OR', 'NEAR(', '*', 'a:b'):
+            with self.subTest(query=query):
+                self.assertEqual(
+                    self.guest.get(SEARCH_URL, {'q': query}).status_code, 200
+                )
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        response = self.guest.get(SEARCH_URL, {'q': 'спит'})
+        self.assertContains(
+            response, 'Кошка &lt;b&gt;<mark>спит</mark>&lt;/b&gt; на окне'
+        )
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при изменении, удалении и bulk_create"""
+        Post.objects.filter(pk=self.post_3.pk).update(text='Про кошку')
+        self.assertEqual(self.search('погоду'), [])
+        self.assertEqual(self.search('кошку'), [self.post_3])
+        self.post_3.delete()
+        self.assertEqual(self.search('кошку'), [])
+        Post.objects.bulk_create([Post(author=self.user, text='Новую кошку')])
+        self.assertEqual(
+            [post.text for post in self.search('кошку')], ['Новую кошку']
+        )
+
+    def test_pagination_keeps_query(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Кошка номер {i}')
+            for i in range(15)
+        )
+        response = self.guest.get(SEARCH_URL, {'q': 'кошка'})
+        self.assertContains(response, '?q=%D0%BA%D0%BE%D1%88%D0%BA%D0%B0')
+        self.assertEqual(len(self.search('кошка', page=2)), 7)
+
+    def test_admin_search_uses_index(self):
+        admin = Client()
+        admin.force_login(self.user)
+        response = admin.get(ADMIN_URL, {'q': 'собака'})
+        self.assertEqual(list(response.context['cl'].result_list), [
+            self.post_2
+        ])
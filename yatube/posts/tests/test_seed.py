@@ -0,0 +1,64 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import AuthorStats, Group, Post, User
+
+POSTS = 300
+
+
+class SeedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_yatube', users=20, groups=5, posts=POSTS, batch_size=70,
+            days=30, seed=1, stdout=StringIO()
+        )
+
+    def test_posts_users_and_groups_are_created(self):
+        self.assertEqual(Post.objects.count(), POSTS)
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Group.objects.count(), 5)
+
+    def test_rerun_reuses_users_and_groups(self):
+        call_command(
+            'seed_yatube', users=20, groups=5, posts=10, stdout=StringIO()
+        )
+        self.assertEqual(Post.objects.count(), POSTS + 10)
+        self.assertEqual(User.objects.count(), 20)
+
+    def test_authors_and_groups_are_skewed(self):
+        """Первые по рангу автор и группа пишут больше последних"""
+        for model, field, first, last in (
+            (User, 'username', 'seed0', 'seed19'),
+            (Group, 'slug', 'seed-0', 'seed-4'),
+        ):
+            with self.subTest(model=model.__name__):
+                counts = dict(
+                    model.objects.annotate(total=Count('posts'))
+                    .values_list(field, 'total')
+                )
+                self.assertGreater(counts[first], 3 * counts[last])
+
+    def test_dates_are_spread_in_the_past(self):
+        now = timezone.now()
+        dates = list(Post.objects.values_list('pub_date', flat=True))
+        self.assertTrue(all(
+            now - timedelta(days=30) <= date <= now for date in dates
+        ))
+        self.assertGreater(len({date.date() for date in dates}), 10)
+
+    def test_counters_and_search_index_are_filled(self):
+        for author in User.objects.annotate(total=Count('posts')):
+            self.assertEqual(
+                AuthorStats.objects.get(author=author).post_count,
+                author.total
+            )
+        for group in Group.objects.annotate(total=Count('posts')):
+            self.assertEqual(group.post_count, group.total)
+        word = Post.objects.first().text.split()[0]
+        self.assertTrue(Post.objects.search(word).exists())
@@ -0,0 +1,156 @@
+import json
+import re
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.metrics import collect, exposition
+
+from ..models import Group, Post, User
+from ..streaming import STREAM_ERROR
+
+NIK = 'streamer'
+SLUG = 'stream_slug'
+MAIN_URL = reverse('posts:index')
+GROUP_URL = reverse('posts:group_list', args=[SLUG])
+PROFILE_URL = reverse('posts:profile', args=[NIK])
+POSTS = 13
+
+
+@override_settings(FEED_CACHE_TIMEOUT=0, FEED_STREAMING=True)
+class StreamingFeedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username=NIK)
+        cls.group = Group.objects.create(
+            title='Потоковая группа', slug=SLUG, description='Описание'
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Пост номер {number}', author=cls.user,
+                 group=cls.group)
+            for number in range(POSTS)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+
+    def test_head_is_sent_before_posts_are_queried(self):
+        """Первая часть ответа - начало страницы без постов"""
+        for url in (MAIN_URL, GROUP_URL, PROFILE_URL):
+            with self.subTest(url=url):
+                response = self.guest.get(url)
+                self.assertTrue(response.streaming)
+                chunks = iter(response.streaming_content)
+                with CaptureQueriesContext(connection) as queries:
+                    head = next(chunks).decode()
+                self.assertIn('<header>', head)
+                self.assertNotIn('Пост номер', head)
+                self.assertFalse([
+                    query for query in queries.captured_queries
+                    if 'posts_post' in query['sql']
+                ])
+                rest = b''.join(chunks).decode()
+                self.assertEqual(rest.count('Пост номер'), 10)
+                self.assertIn('</html>', rest)
+
+    def test_streamed_page_matches_rendered_page(self):
+        """Потоковая страница содержит те же посты и пагинатор"""
+        for pagination in ('pages', 'cursor'):
+            for url in (MAIN_URL, GROUP_URL, PROFILE_URL):
+                with self.subTest(url=url, pagination=pagination), \
+                        override_settings(FEED_PAGINATION=pagination):
+                    streamed = b''.join(
+                        self.guest.get(url).streaming_content
+                    ).decode()
+                    with override_settings(FEED_STREAMING=False):
+                        rendered = self.guest.get(url).content.decode()
+                    self.assertEqual(
+                        re.findall(r'Пост номер \d+', streamed),
+                        re.findall(r'Пост номер \d+', rendered)
+                    )
+                    self.assertEqual(
+                        streamed.count('page-link'),
+                        rendered.count('page-link')
+                    )
+
+    def test_second_page(self):
+        response = self.guest.get(MAIN_URL, {'page': 2})
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(content.count('Пост номер'), POSTS - 10)
+        self.assertEqual(content.count('<hr>'), POSTS - 10 - 1)
+
+    @override_settings(FEED_CACHE_TIMEOUT=60)
+    def test_streamed_page_is_cached_once_read(self):
+        content = b''.join(self.guest.get(MAIN_URL).streaming_content)
+        with self.assertNumQueries(0):
+            response = self.guest.get(MAIN_URL)
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.content, content)
+
+
+@override_settings(FEED_CACHE_TIMEOUT=60, FEED_STREAMING=True)
+class StreamingInstrumentationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username=NIK)
+        Post.objects.create(text='Пост номер 1', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings = override_settings(
+            METRICS_DIR=self.directory, PROFILING_SAMPLE_RATE=1
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_streamed_body_is_profiled_and_counted(self):
+        """Профиль и метрики учитывают запросы, сделанные при отдаче
+        тела"""
+        response = Client().get(MAIN_URL)
+        with self.assertLogs('core.profiling') as logs:
+            b''.join(response.streaming_content)
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertIn('includes/post_card.html', record['templates'])
+        self.assertGreater(record['sql_count'], 0)
+        content = exposition(*collect(self.directory))
+        self.assertIn(
+            'yatube_http_requests_total'
+            '{view="posts:index",method="GET",status="200"} 1', content
+        )
+        self.assertNotIn(
+            'yatube_db_queries_per_request_bucket'
+            '{view="posts:index",le="+Inf"} 0', content
+        )
+
+    def test_error_after_head_finishes_page(self):
+        """Ошибка после начала страницы: страница дописана с сообщением,
+        запрос учтён как ошибка и не попал в кэш"""
+        with mock.patch(
+            'posts.views.paginator_page', side_effect=DatabaseError
+        ):
+            response = Client().get(MAIN_URL)
+            chunks = []
+            with self.assertRaises(DatabaseError), \
+                    self.assertLogs('core.profiling'):
+                for chunk in response.streaming_content:
+                    chunks.append(chunk)
+        content = b''.join(chunks).decode()
+        self.assertIn(STREAM_ERROR, content)
+        self.assertTrue(content.rstrip().endswith('</html>'))
+        self.assertIn(
+            'yatube_http_requests_total'
+            '{view="posts:index",method="GET",status="500"} 1',
+            exposition(*collect(self.directory))
+        )
+        self.assertIn(
+            'Пост номер 1', Client().get(MAIN_URL).getvalue().decode()
+        )
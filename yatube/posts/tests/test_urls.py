@@ -1,3 +1,4 @@
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
@@ -55,6 +56,7 @@ class PostsURLTests(TestCase):
         cls.POST_EDIT_REDIRECT = f'{LOGIN}?next={cls.EDIT_POST_URL}'
 
     def setUp(self):
+        cache.clear()
         # первый клиент автор поста
         self.guest = Client()
         self.author = Client()
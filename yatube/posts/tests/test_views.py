@@ -2,10 +2,15 @@ import shutil
 import tempfile
 
 from django.conf import settings
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from ..counters import recount
 from ..models import Group, Post, User
+from ..paginators import encode_cursor, NEXT, PREVIOUS
 
 POSTS_SECOND_PAGE = 3
 MAIN_URL = reverse('posts:index')
@@ -67,6 +72,7 @@ class PostsPagesTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         # первый клиент автор поста
         self.guest_client = Client()
         self.authorized_client = Client()
@@ -135,6 +141,9 @@ class PaginatorTest(TestCase):
         )
         cls.guest = Client()
 
+    def setUp(self):
+        cache.clear()
+
     def test_paginator(self):
         urls = {
             MAIN_URL: settings.MAX_POSTS,
@@ -150,3 +159,186 @@ class PaginatorTest(TestCase):
                 self.assertEqual(
                     len(response.context['page_obj']), number
                 )
+
+    def test_cursor_paginator(self):
+        '''Курсорная пагинация проходит ленты вперёд и назад'''
+        for url in (MAIN_URL, GROUP_URL, PROFILE_URL):
+            with self.subTest(url=url):
+                first = self.guest.get(url, {'cursor': ''}).context['page_obj']
+                self.assertEqual(len(first), settings.MAX_POSTS)
+                self.assertFalse(first.has_previous())
+                self.assertTrue(first.has_next())
+                second = self.guest.get(
+                    url, {'cursor': first.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second), POSTS_SECOND_PAGE)
+                self.assertFalse(second.has_next())
+                self.assertEqual(
+                    list(first) + list(second),
+                    list(Post.objects.order_by('-pub_date', '-pk'))
+                )
+                back = self.guest.get(
+                    url, {'cursor': second.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+                self.assertFalse(back.has_previous())
+
+    def test_cursor_mode_keeps_legacy_page_links(self):
+        '''В курсорном режиме ссылки ?page= продолжают работать'''
+        with self.settings(FEED_PAGINATION='cursor'):
+            self.assertTrue(
+                self.guest.get(MAIN_URL).context['page_obj'].next_cursor
+            )
+            self.assertEqual(len(
+                self.guest.get(MAIN_PAGE_PAGINATOR_SECOND).context['page_obj']
+            ), POSTS_SECOND_PAGE)
+
+    def test_broken_cursor_opens_first_page(self):
+        response = self.guest.get(MAIN_URL, {'cursor': 'broken'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+    def test_cursor_with_out_of_range_pk_opens_first_page(self):
+        """pk курсора вне 64-битных целых не доходит до базы"""
+        oldest = Post.objects.order_by('pub_date', 'pk').first()
+        for direction, pk in ((NEXT, 10 ** 23), (PREVIOUS, -10 ** 23)):
+            with self.subTest(direction=direction, pk=pk):
+                response = self.guest.get(MAIN_URL, {
+                    'cursor': encode_cursor(direction, oldest.pub_date, pk)
+                })
+                self.assertEqual(response.status_code, 200)
+                page = response.context['page_obj']
+                self.assertEqual(len(page), settings.MAX_POSTS)
+                self.assertFalse(page.has_previous())
+
+    def test_stale_cursor_opens_first_page(self):
+        """Курсор за последним постом ленты открывает первую страницу"""
+        oldest = Post.objects.order_by('pub_date', 'pk').first()
+        stale = encode_cursor(NEXT, oldest.pub_date, oldest.pk)
+        for url in (MAIN_URL, PROFILE_URL):
+            with self.subTest(url=url):
+                response = self.guest.get(url, {'cursor': stale})
+                self.assertEqual(response.status_code, 200)
+                page = response.context['page_obj']
+                self.assertEqual(len(page), settings.MAX_POSTS)
+                self.assertFalse(page.has_previous())
+                self.assertTrue(page.next_cursor)
+
+
+@override_settings(FEED_CACHE_TIMEOUT=0)
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug=SLUG_1,
+            description='Тестовое описание',
+        )
+        cls.user = User.objects.create(username=NIK_1)
+        authors = [cls.user] + [
+            User.objects.create(username=f'author_{i}') for i in range(3)
+        ]
+        Post.objects.bulk_create(
+            Post(
+                text=f'Тестовый текст{i}',
+                author=authors[i % len(authors)],
+                group=cls.group if i % 2 else None,
+            )
+            for i in range(40)
+        )
+        recount()
+        cls.guest = Client()
+
+    def test_feed_queries_do_not_depend_on_page_size(self):
+        """Число запросов ленты не зависит от размера страницы; число
+        постов группы и автора берётся из счётчиков"""
+        urls = {
+            MAIN_URL: 2,
+            GROUP_URL: 2,
+            PROFILE_URL: 2,
+        }
+        for url, queries in urls.items():
+            for max_posts in (1, settings.MAX_POSTS, 20):
+                with self.subTest(url=url, max_posts=max_posts):
+                    with self.settings(MAX_POSTS=max_posts):
+                        with self.assertNumQueries(queries):
+                            self.guest.get(url)
+
+
+@override_settings(MAX_PER_PAGE=15)
+class PerPageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug=SLUG_1,
+            description='Тестовое описание',
+        )
+        cls.user = User.objects.create(username=NIK_1)
+        Post.objects.bulk_create(
+            Post(text=f'Текст {i}', author=cls.user, group=cls.group)
+            for i in range(23)
+        )
+        recount()
+        cls.guest = Client()
+
+    def setUp(self):
+        cache.clear()
+
+    def page(self, url, **params):
+        return self.guest.get(url, params).context['page_obj']
+
+    def test_page_size_is_bounded(self):
+        """?per_page= меняет размер страницы в пределах MAX_PER_PAGE"""
+        sizes = {'5': 5, '100': 15, '0': 1, 'много': settings.MAX_POSTS}
+        for url in (MAIN_URL, GROUP_URL, PROFILE_URL):
+            for per_page, size in sizes.items():
+                with self.subTest(url=url, per_page=per_page):
+                    self.assertEqual(
+                        len(self.page(url, per_page=per_page)), size
+                    )
+
+    def test_pages_are_selected_without_count(self):
+        """Следующая страница определяется по лишней строке, число
+        постов группы и автора - по счётчикам"""
+        for url in (GROUP_URL, PROFILE_URL):
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    page = self.page(url, per_page=5, page=2)
+                sql = [query['sql'] for query in queries.captured_queries]
+                self.assertFalse([text for text in sql if 'COUNT(' in text])
+                self.assertTrue([text for text in sql if 'LIMIT 6' in text])
+                self.assertTrue(page.has_next())
+                self.assertEqual(page.paginator.num_pages, 5)
+                last = self.page(url, per_page=5, page=5)
+                self.assertEqual(len(last), 3)
+                self.assertFalse(last.has_next())
+
+    def test_index_count_is_cached(self):
+        """Общее число постов считается один раз на версию ленты"""
+        self.page(MAIN_URL, per_page=5)
+        with CaptureQueriesContext(connection) as queries:
+            page = self.page(MAIN_URL, per_page=5, page=2)
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if 'COUNT(' in query['sql']
+        ])
+        self.assertEqual(page.paginator.num_pages, 5)
+
+    def test_page_out_of_range(self):
+        """Номер за пределами ленты открывает последнюю страницу,
+        нечисловой - первую"""
+        self.assertEqual(self.page(GROUP_URL, page=100).number, 3)
+        self.assertEqual(self.page(GROUP_URL, page='последняя').number, 1)
+
+    def test_huge_page_number_opens_last_page(self):
+        """Номер больше любого смещения в базе открывает последнюю
+        страницу, а не ошибку"""
+        for url in (MAIN_URL, GROUP_URL, PROFILE_URL):
+            for number in ('9223372036854775807', '99999999999999999999'):
+                with self.subTest(url=url, number=number):
+                    response = self.guest.get(url, {'page': number})
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(response.context['page_obj'].number, 3)
@@ -0,0 +1,10 @@
+from PIL import Image
+from sorl.thumbnail.engines.pil_engine import Engine as PILEngine
+
+
+class Engine(PILEngine):
+    """PIL-движок sorl-thumbnail для Pillow 10+: там удалён
+    Image.ANTIALIAS, тот же фильтр называется Image.LANCZOS."""
+
+    def _scale(self, image, width, height):
+        return image.resize((width, height), resample=Image.LANCZOS)
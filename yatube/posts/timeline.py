@@ -0,0 +1,121 @@
+"""Лента подписок с раскладкой постов при записи.
+
+При публикации пост копируется в ленты всех подписчиков автора
+(TimelineEntry), поэтому лента читается одним диапазоном по индексу
+(user, -pub_date, -id), сколько бы авторов ни было в подписках.
+У популярных авторов - больше FOLLOW_FANOUT_LIMIT подписчиков -
+запись в каждую ленту слишком дорога: их новые посты подписчик
+забирает в свою ленту сам, когда её открывает.
+
+Число записей ленты для номеров страниц кэшируется по версии ленты
+timeline_feed(user_id); версию сбрасывают раскладка, забор постов,
+подписка и отписка. Записи удалённых постов пропадают из числа не
+позже чем через FEED_CACHE_TIMEOUT.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import counters
+from .cache import invalidate_feeds, profile_feed, timeline_feed
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+BATCH_SIZE = 500
+
+
+def _insert(entries):
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, BATCH_SIZE))
+        if not batch:
+            return
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def invalidate_timelines(user_ids):
+    invalidate_feeds(*map(timeline_feed, user_ids))
+
+
+def _copy_posts(user_id, posts):
+    """Копирует в ленту пользователя последние TIMELINE_BACKFILL постов
+    из запроса. Возвращает число скопированных постов."""
+    rows = list(posts.order_by('-pub_date').values_list(
+        'pk', 'pub_date'
+    )[:settings.TIMELINE_BACKFILL])
+    _insert(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in rows
+    )
+    return len(rows)
+
+
+def is_popular(author_id):
+    return AuthorStats.objects.filter(
+        author_id=author_id,
+        follower_count__gt=settings.FOLLOW_FANOUT_LIMIT
+    ).exists()
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_popular(post.author_id):
+        return
+    # Подписчиков не больше FOLLOW_FANOUT_LIMIT
+    user_ids = list(Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True))
+    _insert(
+        TimelineEntry(user_id=user_id, post_id=post.pk, pub_date=post.pub_date)
+        for user_id in user_ids
+    )
+    invalidate_timelines(user_ids)
+
+
+def pull(user_id):
+    """Забирает в ленту пользователя новые посты популярных авторов
+    из его подписок."""
+    follows = Follow.objects.filter(
+        user_id=user_id,
+        author__stats__follower_count__gt=settings.FOLLOW_FANOUT_LIMIT
+    ).only('author_id', 'pulled_at')
+    copied = 0
+    for follow in follows:
+        pulled_at = timezone.now()
+        posts = Post.objects.filter(author_id=follow.author_id)
+        if follow.pulled_at is not None:
+            posts = posts.filter(pub_date__gte=follow.pulled_at)
+        with transaction.atomic():
+            copied += _copy_posts(user_id, posts)
+            Follow.objects.filter(pk=follow.pk).update(pulled_at=pulled_at)
+    if copied:
+        invalidate_timelines([user_id])
+
+
+def follow(user, author):
+    """Подписывает пользователя на автора и сразу добавляет в его ленту
+    последние посты автора. Возвращает False, если подписка уже была."""
+    with transaction.atomic():
+        _, created = Follow.objects.get_or_create(
+            user=user, author=author,
+            defaults={'pulled_at': timezone.now()}
+        )
+        if not created:
+            return False
+        counters.change_follower_count(author.pk, 1)
+        _copy_posts(user.pk, Post.objects.filter(author=author))
+    invalidate_feeds(profile_feed(author.username), timeline_feed(user.pk))
+    return True
+
+
+def unfollow(user, author):
+    """Отменяет подписку и убирает посты автора из ленты пользователя."""
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(user=user, author=author).delete()
+        if not deleted:
+            return False
+        counters.change_follower_count(author.pk, -1)
+        TimelineEntry.objects.filter(user=user, post__author=author).delete()
+    invalidate_feeds(profile_feed(author.username), timeline_feed(user.pk))
+    return True
@@ -1,57 +1,166 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
-from .forms import PostForm
-from .models import Group, Post, User
+from . import timeline
+from .cache import (
+    cache_feed, feed_count, group_feed, index_feed, profile_feed,
+    timeline_feed
+)
+from .conditional import conditional_feed, conditional_post
+from .forms import PostForm, PostImageForm
+from .models import Follow, Group, Post, User
+from .paginators import CursorPaginator, ProbePaginator
+from .search import highlight
+from .streaming import stream_feed
 
 
-def paginator_page(post_list, request):
-    return Paginator(
-        post_list, settings.MAX_POSTS
+def per_page(request):
+    """Размер страницы из ?per_page=, не больше MAX_PER_PAGE; без
+    параметра или с неверным значением - MAX_POSTS."""
+    try:
+        number = int(request.GET['per_page'])
+    except (KeyError, ValueError):
+        return settings.MAX_POSTS
+    return min(max(number, 1), settings.MAX_PER_PAGE)
+
+
+def paginator_page(post_list, request, counter=None):
+    """Страница ленты: по курсору (?cursor=) или по номеру (?page=).
+    Старые ссылки с ?page= работают и в курсорном режиме. counter()
+    возвращает число постов ленты для номеров страниц."""
+    cursor = request.GET.get('cursor')
+    if cursor is not None or (
+        settings.FEED_PAGINATION == 'cursor' and 'page' not in request.GET
+    ):
+        return CursorPaginator(
+            post_list, per_page(request)
+        ).get_page(cursor)
+    return ProbePaginator(
+        post_list, per_page(request), counter
     ).get_page(request.GET.get('page'))
 
 
+def render_feed(request, template_name, context, post_list, counter=None):
+    """Страница ленты из post_list. С FEED_STREAMING ответ потоковый:
+    начало страницы уходит до запроса постов."""
+    if not settings.FEED_STREAMING:
+        return render(request, template_name, {
+            **context,
+            'page_obj': paginator_page(post_list, request, counter),
+        })
+    return StreamingHttpResponse(stream_feed(
+        request, template_name, context,
+        lambda: paginator_page(post_list, request, counter)
+    ))
+
+
+@conditional_feed(index_feed)
+@cache_feed(index_feed)
 def index(request):
-    return render(request, 'posts/index.html', {
-        'page_obj': paginator_page(Post.objects.all(), request),
-    })
+    post_list = Post.objects.feed()
+    return render_feed(
+        request, 'posts/index.html', {}, post_list,
+        lambda: feed_count(index_feed(), post_list)
+    )
 
 
+@conditional_feed(group_feed)
+@cache_feed(group_feed)
 def group_posts(request, slug):
     """Получение постов нужной группы по запросу"""
     group = get_object_or_404(Group, slug=slug)
-    return render(request, 'posts/group_list.html', {
+    return render_feed(request, 'posts/group_list.html', {
         'group': group,
-        'page_obj': paginator_page(group.posts.all(), request)
-    })
+    }, group.posts.feed(), lambda: group.post_count)
 
 
+@conditional_feed(profile_feed)
+@cache_feed(profile_feed)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    return render(request, 'posts/profile.html', {
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    stats = getattr(author, 'stats', None)
+    return render_feed(request, 'posts/profile.html', {
         'author': author,
-        'page_obj': paginator_page(author.posts.all(), request),
-    })
+        'following': request.user.is_authenticated and Follow.objects.filter(
+            user=request.user, author=author
+        ).exists(),
+    }, author.posts.feed(), None if stats is None else (
+        lambda: stats.post_count
+    ))
 
 
+@conditional_post
 def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', {
-        'post': get_object_or_404(Post, pk=post_id),
+        'post': get_object_or_404(Post.objects.detail(), pk=post_id),
+    })
+
+
+def search(request):
+    """Поиск постов по словам запроса, по убыванию релевантности."""
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        page_obj = Paginator(
+            Post.objects.feed().search(query), settings.MAX_POSTS
+        ).get_page(request.GET.get('page'))
+        for post in page_obj:
+            post.snippet_html = highlight(post.snippet)
+    return render(request, 'posts/search.html', {
+        'query': query,
+        'page_obj': page_obj,
     })
 
 
+@login_required
+def follow_index(request):
+    """Посты авторов, на которых подписан пользователь."""
+    timeline.pull(request.user.pk)
+    post_list = request.user.timeline.feed()
+    return render(request, 'posts/follow.html', {
+        'page_obj': paginator_page(post_list, request, lambda: feed_count(
+            timeline_feed(request.user.pk), post_list
+        )),
+    })
+
+
+@login_required
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        timeline.follow(request.user, author)
+    return redirect('posts:profile', username=username)
+
+
+@login_required
+def profile_unfollow(request, username):
+    timeline.unfollow(
+        request.user, get_object_or_404(User, username=username)
+    )
+    return redirect('posts:profile', username=username)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None)
-    if not form.is_valid():
+    image_form = PostImageForm(
+        request.POST or None, request.FILES or None, instance=form.instance
+    )
+    if not all((form.is_valid(), image_form.is_valid())):
         return render(request, 'posts/create_post.html', {
-            'form': form
+            'form': form,
+            'image_form': image_form,
         })
     post = form.save(commit=False)
     post.author = request.user
-    post.save()
+    with transaction.atomic():
+        post.save()
     return redirect('posts:profile', username=post.author)
 
 
@@ -61,10 +170,15 @@ def post_edit(request, post_id):
     if request.user != post.author:
         return redirect('posts:profile', username=post.author)
     form = PostForm(request.POST or None, instance=post)
-    if not form.is_valid():
+    image_form = PostImageForm(
+        request.POST or None, request.FILES or None, instance=post
+    )
+    if not all((form.is_valid(), image_form.is_valid())):
         return render(request, 'posts/create_post.html', {
             'form': form,
+            'image_form': image_form,
             'post': post,
         })
-    form.save()
+    with transaction.atomic():
+        form.save()
     return redirect('posts:post_detail', post.pk)
@@ -0,0 +1,17 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``:
+
+    uvicorn yatube.asgi:application
+
+Django 2.2 has no ASGI handler, so the WSGI application runs on a pool of
+ASGI_THREADS threads (see core/asgi.py).
+"""
+
+from django.conf import settings
+
+from core.asgi import WsgiToAsgi
+from yatube.wsgi import application as wsgi_application
+
+application = WsgiToAsgi(wsgi_application, settings.ASGI_THREADS)
@@ -41,23 +41,39 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'sorl.thumbnail',
 
     # 'debug_toolbar',
 
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
+    'core.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'core.routers.ReplicaMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     # 'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
 MAX_POSTS = 10
+# Upper bound of ?per_page= on feed pages
+MAX_PER_PAGE = 100
+# Пагинация лент: 'pages' - по номеру страницы, 'cursor' - по курсору
+FEED_PAGINATION = 'pages'
+# Stream feed pages: the page head is sent before the posts are queried,
+# post cards follow as rows are read (see posts/streaming.py)
+FEED_STREAMING = False
+# Authors with more followers are not fanned out to follower timelines
+# on write; followers pull their new posts when reading the follow feed
+FOLLOW_FANOUT_LIMIT = 1000
+# Recent posts of an author copied to a timeline on follow or pull
+TIMELINE_BACKFILL = 100
 
 ROOT_URLCONF = 'yatube.urls'
 
@@ -82,8 +98,42 @@ TEMPLATES = [
     },
 ]
 
+# Parse every project template when the WSGI application starts, so the
+# first request of each worker does not pay for it (see core/template_cache)
+PRECOMPILE_TEMPLATES = False
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Threads of yatube.asgi.application: requests served at once by one worker
+# process. Keep it within what the database accepts in connections
+ASGI_THREADS = 32
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Seconds to keep rendered feed pages in the cache, 0 disables it
+FEED_CACHE_TIMEOUT = 60 * 5
+# Seconds to keep a feed version (see posts/cache.py); an expired version
+# is replaced by a new one, so the limit only bounds the number of keys
+FEED_VERSION_TIMEOUT = 60 * 60 * 24
+
+
+# Background tasks (core.tasks, worker: manage.py run_tasks)
+
+# Attempts before a failing task is marked as failed
+TASK_MAX_ATTEMPTS = 5
+# Retry delay in seconds, doubled after every failed attempt
+TASK_RETRY_DELAY = 10
+# Seconds after which a task of a crashed worker is taken again
+TASK_LOCK_TIMEOUT = 60 * 5
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -95,6 +145,25 @@ DATABASES = {
     }
 }
 
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Read replicas: aliases from DATABASES that serve reads of REPLICA_APPS
+# models in GET requests. A copy of the SQLite file works for local tests:
+#     DATABASES['replica'] = {
+#         'ENGINE': 'django.db.backends.sqlite3',
+#         'NAME': os.path.join(BASE_DIR, 'replica.sqlite3'),
+#         'TEST': {'MIRROR': 'default'},
+#     }
+#     DATABASE_REPLICAS = ['replica']
+DATABASE_REPLICAS = []
+REPLICA_APPS = ('posts',)
+# Upper bound of replication lag in seconds: after a write the user reads
+# from the primary for this long
+REPLICA_LAG = 5
+
+# PRAGMA statements run on every new SQLite connection (see core/db.py)
+SQLITE_PRAGMAS = {}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -146,12 +215,90 @@ ALLOWED_HOSTS = [
 
 
 STATIC_URL = '/static/'
+
+# collectstatic target; settings_production adds hashing and compression
+STATIC_ROOT = os.path.join(BASE_DIR, 'static_root')
+
+# Serve STATIC_ROOT from the WSGI application itself (see yatube/wsgi.py)
+SERVE_STATIC = False
+
+# Uploaded post images and their thumbnails
+
+MEDIA_URL = '/media/'
+
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Thumbnail widths generated for every post image, used in srcset
+POST_IMAGE_WIDTHS = (320, 640, 960)
+
+THUMBNAIL_ENGINE = 'posts.thumbnails.Engine'
+
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
 
 # Connect filebased.EmailBackend
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Requests only queue letters; the task worker delivers them in batches
+# through a single connection of EMAIL_DELIVERY_BACKEND
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+
+EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+
+# Seconds to collect letters into one delivery task
+EMAIL_BATCH_DELAY = 5
+
+# Letters sent per database round trip of the delivery task
+EMAIL_BATCH_SIZE = 100
+
+# Failed deliveries before a letter is given up
+EMAIL_MAX_ATTEMPTS = 5
 
 # Specify the directory in which the files of letters will be added
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+
+# Profiling (core.profiling.ProfilingMiddleware)
+
+# Fraction of requests to profile, from 0 (middleware off) to 1
+PROFILING_SAMPLE_RATE = 0
+
+# A SQL statement run this many times in one request is reported as
+# a likely N+1 query
+PROFILING_SIMILAR_QUERIES = 3
+
+# Send the measurements of profiled requests in a Server-Timing header;
+# only staff users (or everyone with DEBUG) receive it
+PROFILING_SERVER_TIMING = False
+
+
+# Prometheus metrics (core.metrics), served at /metrics
+
+# Directory where every worker process writes its metrics; None turns
+# the middleware and the endpoint off. Empty it when the server restarts
+METRICS_DIR = None
+
+# Seconds between writes of a worker's metrics to METRICS_DIR
+METRICS_FLUSH_INTERVAL = 1
+
+# Clients allowed to read /metrics: REMOTE_ADDR in METRICS_ALLOWED_IPS
+# (behind a reverse proxy that is the proxy's address) or an
+# "Authorization: Bearer <METRICS_TOKEN>" header
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+
+# Benchmarks
+
+# Benchmarks seed and write to the default database; outside DEBUG they
+# run only when it is a throwaway copy marked with this flag
+BENCHMARK_DISPOSABLE_DATABASE = False
+
+# manage.py bench_endpoints --baseline: allowed growth of each metric over
+# the baseline run, as a fraction of the baseline value
+BENCHMARK_THRESHOLDS = {
+    'p50_ms': 0.25,
+    'p95_ms': 0.5,
+    'queries': 0,
+    'memory_kb': 0.25,
+}
@@ -0,0 +1,70 @@
+"""
+Production settings for yatube.
+
+Use with DJANGO_SETTINGS_MODULE=yatube.settings_production and run
+``manage.py collectstatic`` on every deploy.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+DEBUG = False
+
+# Keep connections open between requests instead of reconnecting (and
+# re-running SQLITE_PRAGMAS) for every one of them
+DATABASES['default']['CONN_MAX_AGE'] = 60  # noqa: F405
+
+# WAL lets readers keep reading while a post is being written; NORMAL
+# syncs only at checkpoints, which is durable enough in WAL mode
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+}
+
+# Content-hashed file names plus .gz (and .br with brotli installed)
+# copies written by collectstatic
+STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStaticFilesStorage'
+
+SERVE_STATIC = True
+
+METRICS_DIR = os.path.join(BASE_DIR, 'metrics')  # noqa: F405
+# /metrics answers only local scrapers; a remote Prometheus must send
+# the METRICS_TOKEN environment variable as a bearer token
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+
+# Feed versions and cached pages must be shared by all worker processes:
+# with a per-process cache a worker that did not handle a write keeps
+# serving the old pages and answering 304 to stale ETags
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),  # noqa: F405
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
+# Templates are read and parsed once per process and kept in memory;
+# restart the workers after deploying template changes
+TEMPLATES = [{
+    **TEMPLATES[0],  # noqa: F405
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],  # noqa: F405
+        'loaders': [(
+            'django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ],
+        )],
+    },
+}]
+
+PRECOMPILE_TEMPLATES = True
+
+# Deep feed pages are read by keyset cursors instead of OFFSET scans;
+# numbered ?page= links keep working
+FEED_PAGINATION = 'cursor'
+
+# Send the head of feed pages before their posts are queried
+FEED_STREAMING = True
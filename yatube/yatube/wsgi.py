@@ -9,8 +9,21 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+if settings.PRECOMPILE_TEMPLATES:
+    from core.template_cache import warm_templates_on_startup
+
+    warm_templates_on_startup()
+
+if settings.SERVE_STATIC:
+    from core.staticfiles import StaticFilesApplication
+
+    application = StaticFilesApplication(
+        application, settings.STATIC_ROOT, settings.STATIC_URL
+    )